@@ -0,0 +1,245 @@
+#!/usr/bin/python3
+
+"""
+# File: bitmap.py
+# Author: Tomás Vírseda
+# License: GPL v3
+# Description: Bitmap index of classified documents (no GTK involved)
+"""
+
+from bisect import bisect_left, bisect_right
+
+from MiAZ.backend.facets import FACET_FIELDS
+
+
+def from_ordinals(ordinals) -> int:
+    """Bitset with the given bits set, built in a single step"""
+    ordinals = list(ordinals)
+    if not ordinals:
+        return 0
+    buf = bytearray(max(ordinals) // 8 + 1)
+    for ordinal in ordinals:
+        buf[ordinal >> 3] |= 1 << (ordinal & 7)
+    return int.from_bytes(buf, 'little')
+
+# Documents changed (1/n of the total) above which the index is rebuilt
+REBUILD_RATIO = 8
+
+
+class MiAZBitmapIndex:
+    """
+    One bitset (a Python int) per field value, per document date and
+    for active documents.
+
+    Every document gets an ordinal (its bit). Filters are then resolved
+    with AND/OR operations over whole bitsets instead of evaluating
+    every document. Field values are compared in upper case, as the
+    workspace dropdown filters do.
+
+    An index is not thread-safe: a worker updates a copy (see copy())
+    while the main thread keeps reading the current one.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._ordinals = {}     # Document name -> ordinal
+        self._names = []        # Ordinal -> document name (None if free)
+        self._free = []         # Ordinals available for reuse
+        self._docs = []         # Ordinal -> (values, date, active)
+        self._fields = {}       # Field -> {value (upper case) -> bitset}
+        for skey, attr in FACET_FIELDS:
+            self._fields[skey] = {}
+        self._dates = {}        # Date (YYYYMMDD, invalid dates as '') -> bitset
+        self._sorted_dates = None
+        self._ranges = {}       # Date range -> bitset (valid until next change)
+        self.all = 0
+        self.active = 0
+
+    def copy(self):
+        """Independent copy. Bitsets are immutable and shared."""
+        index = MiAZBitmapIndex.__new__(MiAZBitmapIndex)
+        index._ordinals = dict(self._ordinals)
+        index._names = list(self._names)
+        index._free = list(self._free)
+        index._docs = list(self._docs)
+        index._fields = {skey: dict(table) for skey, table in self._fields.items()}
+        index._dates = dict(self._dates)
+        index._sorted_dates = self._sorted_dates
+        index._ranges = {}
+        index.all = self.all
+        index.active = self.active
+        return index
+
+    def __len__(self):
+        return len(self._ordinals)
+
+    def _set(self, table: dict, key: str, bit: int):
+        table[key] = table.get(key, 0) | bit
+
+    def _unset(self, table: dict, key: str, bit: int):
+        bits = table[key] & ~bit
+        if bits:
+            table[key] = bits
+        else:
+            del table[key]
+
+    def add(self, name: str, item):
+        """Index (or reindex) a document (MiAZRow)"""
+        values = tuple(getattr(item, attr).upper() for skey, attr in FACET_FIELDS)
+        date = item.date if item.valid and item.date_dsc else ''
+        record = (values, date, item.active)
+        ordinal = self._ordinals.get(name)
+        if ordinal is not None:
+            if self._docs[ordinal] == record:
+                return
+            self._unlink(ordinal)
+        elif self._free:
+            ordinal = self._free.pop()
+            self._names[ordinal] = name
+        else:
+            ordinal = len(self._names)
+            self._names.append(name)
+            self._docs.append(None)
+        self._ordinals[name] = ordinal
+        self._docs[ordinal] = record
+        bit = 1 << ordinal
+        for (skey, attr), value in zip(FACET_FIELDS, values):
+            self._set(self._fields[skey], value, bit)
+        if date not in self._dates:
+            self._sorted_dates = None
+        self._set(self._dates, date, bit)
+        if item.active:
+            self.active |= bit
+        self.all |= bit
+        self._ranges = {}
+
+    def remove(self, name: str):
+        ordinal = self._ordinals.pop(name, None)
+        if ordinal is None:
+            return
+        self._unlink(ordinal)
+        self._names[ordinal] = None
+        self._docs[ordinal] = None
+        self._free.append(ordinal)
+
+    def _unlink(self, ordinal: int):
+        values, date, active = self._docs[ordinal]
+        bit = 1 << ordinal
+        for (skey, attr), value in zip(FACET_FIELDS, values):
+            self._unset(self._fields[skey], value, bit)
+        self._unset(self._dates, date, bit)
+        if date not in self._dates:
+            self._sorted_dates = None
+        self.active &= ~bit
+        self.all &= ~bit
+        self._ranges = {}
+
+    def build(self, items: dict):
+        """Index all documents (name -> MiAZRow) at once.
+
+        Updating a bitset costs as much as its size, so every bitset is
+        built once here instead of document by document.
+        """
+        self.clear()
+        fields = {skey: {} for skey, attr in FACET_FIELDS}
+        dates = {}
+        active = []
+        for ordinal, (name, item) in enumerate(items.items()):
+            values = tuple(getattr(item, attr).upper() for skey, attr in FACET_FIELDS)
+            date = item.date if item.valid and item.date_dsc else ''
+            self._ordinals[name] = ordinal
+            self._names.append(name)
+            self._docs.append((values, date, item.active))
+            for (skey, attr), value in zip(FACET_FIELDS, values):
+                fields[skey].setdefault(value, []).append(ordinal)
+            dates.setdefault(date, []).append(ordinal)
+            if item.active:
+                active.append(ordinal)
+        for skey, table in fields.items():
+            self._fields[skey] = {value: from_ordinals(ordinals) for value, ordinals in table.items()}
+        self._dates = {date: from_ordinals(ordinals) for date, ordinals in dates.items()}
+        self.active = from_ordinals(active)
+        self.all = (1 << len(self._names)) - 1
+
+    def update(self, previous: dict, current: dict):
+        """Apply the differences between two dictionaries of documents
+        (name -> MiAZRow). Rows are compared by identity. Large
+        changes rebuild the index."""
+        removed = [name for name in previous if name not in current]
+        changed = [name for name, item in current.items()
+                   if previous.get(name) is not item or name not in self._ordinals]
+        if len(removed) + len(changed) > len(current) // REBUILD_RATIO:
+            self.build(current)
+            return
+        for name in removed:
+            self.remove(name)
+        for name in changed:
+            self.add(name, current[name])
+
+    def field(self, skey: str, selected: str) -> int:
+        """Documents matching a dropdown selection ('Any', 'None' or a
+        value). None means no restriction."""
+        if selected is None or selected == 'Any':
+            return None
+        if selected == 'None':
+            selected = ''
+        return self._fields[skey].get(selected.upper(), 0)
+
+    def values(self, skey: str) -> dict:
+        """Bitsets of every value of a field (value -> bitset)"""
+        return self._fields[skey]
+
+    def dates(self, start: str, end: str) -> int:
+        """Documents with a valid date between start and end (YYYYMMDD)"""
+        key = (start, end)
+        try:
+            return self._ranges[key]
+        except KeyError:
+            pass
+        if self._sorted_dates is None:
+            self._sorted_dates = sorted(date for date in self._dates if date)
+        dates = self._sorted_dates
+        bits = 0
+        for pos in range(bisect_left(dates, start), bisect_right(dates, end)):
+            bits |= self._dates[dates[pos]]
+        self._ranges[key] = bits
+        return bits
+
+    def undated(self) -> int:
+        """Documents without a valid date"""
+        return self._dates.get('', 0)
+
+    def bitset(self, names) -> int:
+        """Bitset of the given document names. Unknown names are ignored."""
+        ordinals = self._ordinals
+        return from_ordinals(ordinals[name] for name in names if name in ordinals)
+
+    def membership(self, bits: int):
+        """Return a callable telling if a document name is in a bitset.
+
+        The bitset is turned into bytes once, so every test is a dict
+        lookup and a byte check (shifting a large int costs O(n)).
+        """
+        data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+        size = len(data)
+        ordinals = self._ordinals
+
+        def contains(name: str) -> bool:
+            ordinal = ordinals.get(name)
+            if ordinal is None or ordinal >> 3 >= size:
+                return False
+            return (data[ordinal >> 3] >> (ordinal & 7)) & 1 == 1
+        return contains
+
+    def names(self, bits: int) -> frozenset:
+        """Document names of a bitset"""
+        found = []
+        digits = bin(bits)[:1:-1]   # Lowest bit first
+        names = self._names
+        pos = digits.find('1')
+        while pos != -1:
+            found.append(names[pos])
+            pos = digits.find('1', pos + 1)
+        return frozenset(found)
@@ -0,0 +1,256 @@
+#!/usr/bin/python3
+
+"""
+# File: columns.py
+# Author: Tomás Vírseda
+# License: GPL v3
+# Description: Compact document rows and columnar storage (no GTK involved)
+"""
+
+import sys
+from collections import Counter, namedtuple
+from itertools import compress, count
+from operator import is_, itemgetter, not_, sub
+
+# Fields of a document row. Same names (and meaning) as the MiAZItem
+# properties, so rows can be used wherever items are only read.
+VALUE_FIELDS = ('id', 'date', 'date_dsc', 'country', 'country_dsc',
+                'group', 'group_dsc', 'sentby_id', 'sentby_dsc',
+                'purpose', 'purpose_dsc', 'title', 'subtitle',
+                'sentto_id', 'sentto_dsc', 'extension')
+
+# Sort keys, computed once when the row is built. Codes compare in
+# upper case, descriptions and concepts case-insensitively.
+SORT_FIELDS = ('sort_date', 'sort_country', 'sort_group', 'sort_purpose',
+               'sort_extension', 'sort_title', 'sort_concept',
+               'sort_sentby', 'sort_sentto')
+
+ROW_FIELDS = VALUE_FIELDS + ('active', 'valid') + SORT_FIELDS
+
+_MiAZRowBase = namedtuple('_MiAZRowBase', ROW_FIELDS)
+
+
+class MiAZRow(_MiAZRowBase):
+    """
+    Classified document, as a plain tuple.
+
+    Rows are what the workspace keeps for every document. Field values
+    are interned, so documents sharing a country, group, description,
+    etc. share the same string. MiAZItem objects are only built from
+    rows when a view asks for them (see MiAZColumnStore).
+    """
+    __slots__ = ()
+
+    @classmethod
+    def new(cls, id: str, date: str = '', date_dsc: str = '',
+            country: str = '', country_dsc: str = '',
+            group: str = '', group_dsc: str = '',
+            sentby_id: str = '', sentby_dsc: str = '',
+            purpose: str = '', purpose_dsc: str = '',
+            title: str = '', subtitle: str = '',
+            sentto_id: str = '', sentto_dsc: str = '',
+            extension: str = '', active: bool = False, valid: bool = False):
+        # Codes and descriptions are resolved through the (shared)
+        # table of interned strings: one copy per distinct value.
+        # Names and titles are unique, so they are kept as they are.
+        intern = sys.intern
+        return cls(id, intern(date), intern(date_dsc),
+                   intern(country), intern(country_dsc),
+                   intern(group), intern(group_dsc),
+                   intern(sentby_id), intern(sentby_dsc),
+                   intern(purpose), intern(purpose_dsc),
+                   title, intern(subtitle),
+                   intern(sentto_id), intern(sentto_dsc),
+                   intern(extension), active, valid,
+                   int(date) if date.isdigit() else 0,
+                   intern(country.upper()), intern(group.upper()),
+                   intern(purpose.upper()), intern(extension.upper()),
+                   title.upper(), intern(subtitle.casefold()),
+                   intern(sentby_dsc.casefold()), intern(sentto_dsc.casefold()))
+
+    @property
+    def search_text(self) -> str:
+        """Text matched by the search entry. Built when asked for."""
+        return ' '.join(self[:len(VALUE_FIELDS)])
+
+
+# Rows changed (1/n of the total) above which rows are filtered and
+# sorted again instead of being inserted one by one
+RESORT_RATIO = 8
+
+# Runs of removed/inserted rows above which a diff is reported as the
+# replacement of a single range
+DIFF_MAX_RUNS = 64
+
+
+# Document name of a row
+row_id = itemgetter(ROW_FIELDS.index('id'))
+
+
+def _missing(rows: list, names: set) -> list:
+    """Positions of the rows whose name is not in names"""
+    return list(compress(count(), map(not_, map(names.__contains__, map(row_id, rows)))))
+
+
+def diff_rows(old: list, new: list, max_runs: int = None):
+    """Removals and insertions turning the list old into new.
+
+    Both lists are taken from the same rows, so rows are matched by
+    document name. Return a list of (position, removed, rows inserted)
+    to be applied in order, or None when rows found in both lists are
+    not in the same order (something moved) or there are more than
+    max_runs of them.
+    """
+    in_old = set(map(row_id, old))
+    in_new = set(map(row_id, new))
+    kept_old = compress(old, map(in_new.__contains__, map(row_id, old)))
+    kept_new = compress(new, map(in_old.__contains__, map(row_id, new)))
+    if not all(map(is_, kept_old, kept_new)):
+        return None
+
+    # Changes between the same two kept rows (the same gap) make a run.
+    # The gap of a position is the number of kept rows before it.
+    removed = list(map(sub, _missing(old, in_new), count()))
+    added = _missing(new, in_old)
+    gaps = list(map(sub, added, count()))
+    n_removed = Counter(removed)
+    first = dict(zip(reversed(gaps), reversed(added)))
+    last = dict(zip(gaps, added))
+    runs = n_removed.keys() | first.keys()
+    if max_runs is not None and len(runs) > max_runs:
+        return None
+
+    result = []
+    inserted = 0
+    for gap in sorted(runs):
+        rows = new[first[gap]:last[gap] + 1] if gap in first else []
+        result.append((gap + inserted, n_removed[gap], rows))
+        inserted += len(rows)
+    return result
+
+
+class MiAZColumns:
+    """
+    Document rows, with their values also available by column.
+
+    Rows (MiAZRow) are kept as given, shared with whoever built them.
+    The column of a field (eg.: a sort key) is the list of its values
+    in every row. It is built the first time it is asked for and kept
+    until rows change, so sorting and filtering work over row
+    positions and plain lists instead of objects. A few rows can also
+    be inserted into an already sorted list (see insert()).
+
+    collate is an optional callable returning the collation key of a
+    value, used for the keys sorted with the locale rules. Keys are
+    computed once per distinct value and kept.
+    """
+
+    def __init__(self, collate=None):
+        self.rows = []
+        self._columns = {}      # (Field, collated) -> list of keys
+        self._positions = None  # Row identity -> position (built when needed)
+        self._collate = collate
+        self._collated = {}     # Value -> collation key
+
+    def __len__(self):
+        return len(self.rows)
+
+    def row(self, position: int) -> MiAZRow:
+        return self.rows[position]
+
+    def _collation_keys(self, values) -> dict:
+        keys = self._collated
+        for value in set(values) - keys.keys():
+            keys[value] = self._collate(value)
+        return keys
+
+    def _collation_key(self, value: str):
+        try:
+            return self._collated[value]
+        except KeyError:
+            key = self._collated[value] = self._collate(value)
+            return key
+
+    def column(self, field: str, collated: bool = False) -> list:
+        """Values of a field in every row, or their collation keys"""
+        try:
+            return self._columns[(field, collated)]
+        except KeyError:
+            pass
+        values = list(map(itemgetter(ROW_FIELDS.index(field)), self.rows))
+        if collated and self._collate is not None:
+            values = list(map(self._collation_keys(values).__getitem__, values))
+        self._columns[(field, collated)] = values
+        return values
+
+    def positions(self, rows) -> list:
+        """Positions of the given rows (rows of this object)"""
+        if self._positions is None:
+            self._positions = {id(row): pos for pos, row in enumerate(self.rows)}
+        return list(map(self._positions.__getitem__, map(id, rows)))
+
+    def sort(self, positions: list, sort: list) -> list:
+        """Sort row positions in place and return them.
+
+        sort is [(key field, descending, collated), ...]: the first key
+        is the primary one and the rest break ties, in order.
+        """
+        # Stable sorts, from the last key to the primary one
+        for field, descending, collated in reversed(sort):
+            positions.sort(key=self.column(field, collated).__getitem__, reverse=descending)
+        return positions
+
+    def sorted_rows(self, positions: list, sort: list) -> list:
+        return list(map(self.rows.__getitem__, self.sort(positions, sort)))
+
+    def insert(self, rows: list, new: list, sort: list, inserted=None) -> list:
+        """Insert rows (new) into a list of rows sorted by sort, after
+        rows with equal keys. Return the list.
+
+        inserted(position) is called after every row is inserted.
+        """
+        if not new:
+            return rows
+        keys = []   # (Callable returning the key of a row, descending)
+        for field, descending, collated in sort:
+            getter = itemgetter(ROW_FIELDS.index(field))
+            if collated and self._collate is not None:
+                getter = self._collated_getter(getter)
+            keys.append((getter, descending))
+
+        def before(a, b) -> bool:
+            for getter, descending in keys:
+                ka = getter(a)
+                kb = getter(b)
+                if ka != kb:
+                    return ka > kb if descending else ka < kb
+            return False
+
+        for row in new:
+            lo, hi = 0, len(rows)
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if before(row, rows[mid]):
+                    hi = mid
+                else:
+                    lo = mid + 1
+            rows.insert(lo, row)
+            if inserted is not None:
+                inserted(lo)
+        return rows
+
+    def _collated_getter(self, getter):
+        collation_key = self._collation_key
+        return lambda row: collation_key(getter(row))
+
+    def set_rows(self, rows) -> bool:
+        """Replace all rows. Return False if they are the same objects,
+        in the same order (nothing to do)."""
+        rows = list(rows)
+        current = self.rows
+        if len(rows) == len(current) and all(new is old for new, old in zip(rows, current)):
+            return False
+        self.rows = rows
+        self._columns = {}
+        self._positions = None
+        return True
@@ -9,22 +9,188 @@
 
 import os
 import shutil
+import weakref
 from gettext import gettext as _
+from types import MappingProxyType
 
+from gi.repository import GLib
 from gi.repository import GObject
 
 from MiAZ.backend.log import MiAZLog
 from MiAZ.backend.models import MiAZModel, Group, Person, Country, Purpose, Concept, SentBy, SentTo, Repository, Plugin
 
+# Changes are written to disk after this delay (ms)
+WRITE_DELAY = 500
+
+# Consolidated repository config store
+STORE_FILE = 'config.json'
+STORE_VERSION = 1
+
+
+class MiAZConfigStore:
+    """
+    Consolidated store for the config files of a repository.
+
+    Every config file under the repository '.conf' directory is kept in
+    a single 'config.json', read with one I/O when the repository is
+    loaded. Files not found in the store are read from the per-file
+    layout the first time (transparent migration). The store is the
+    reference afterwards, but every write is also exported to the
+    original file, so the per-file layout stays usable (config export,
+    older versions).
+    """
+    _stores = {}    # dir_conf -> MiAZConfigStore
+
+    def __init__(self, app, dir_conf: str):
+        self.app = app
+        self.log = MiAZLog('MiAZ.Config.Store')
+        self.dir_conf = dir_conf
+        self.filepath = os.path.join(dir_conf, STORE_FILE)
+        self._files = {}    # Path relative to dir_conf -> items
+        self._dirty = False
+        self._flush_source = 0
+
+    @classmethod
+    def register(cls, store):
+        cls._stores[store.dir_conf] = store
+
+    @classmethod
+    def unregister_all(cls):
+        for store in list(cls._stores.values()):
+            store.flush()
+        cls._stores = {}
+
+    @classmethod
+    def lookup(cls, filepath: str):
+        """Return the store holding the given config file, if any"""
+        for dir_conf, store in cls._stores.items():
+            if filepath.startswith(dir_conf + os.sep):
+                return store
+        return None
+
+    @classmethod
+    def flush_all(cls) -> bool:
+        saved = True
+        for store in cls._stores.values():
+            saved = store.flush() and saved
+        return saved
+
+    def _key(self, filepath: str) -> str:
+        return os.path.relpath(filepath, self.dir_conf)
+
+    def load(self) -> bool:
+        util = self.app.get_service('util')
+        try:
+            data = util.json_load(self.filepath)
+        except FileNotFoundError:
+            self.log.info(f"Store {self.filepath} not found. Config files will be migrated")
+            return False
+        except Exception as error:
+            self.log.error(f"Store {self.filepath} could not be loaded: {error}")
+            return False
+        if data.get('version') != STORE_VERSION:
+            self.log.warning(f"Store {self.filepath} has another format. Config files will be migrated")
+            return False
+        self._files = data['files']
+        self.log.debug(f"Store {self.filepath} loaded ({len(self._files)} files)")
+        return True
+
+    def contains(self, filepath: str) -> bool:
+        return self._key(filepath) in self._files
+
+    def get(self, filepath: str) -> dict:
+        """Return the items of a config file, or None if not stored"""
+        return self._files.get(self._key(filepath))
+
+    def migrate(self, filepath: str, items: dict):
+        """Add the items read from a per-file config"""
+        self._files[self._key(filepath)] = items
+        self._schedule()
+
+    def save(self, filepath: str, items: dict):
+        """Store the items and export them to their own file"""
+        util = self.app.get_service('util')
+        self._files[self._key(filepath)] = items
+        util.json_save(filepath, items)
+        self._schedule()
+
+    def _schedule(self):
+        self._dirty = True
+        if not self._flush_source:
+            self._flush_source = GLib.timeout_add(WRITE_DELAY, self._on_flush_timeout)
+
+    def _on_flush_timeout(self):
+        self._flush_source = 0
+        self.flush()
+        return False
+
+    def flush(self) -> bool:
+        if self._flush_source:
+            GLib.source_remove(self._flush_source)
+            self._flush_source = 0
+        if not self._dirty:
+            return True
+        util = self.app.get_service('util')
+        try:
+            util.json_save(self.filepath, {'version': STORE_VERSION, 'files': self._files})
+        except Exception as error:
+            self.log.error(f"Store {self.filepath} could not be saved: {error}")
+            return False
+        self._dirty = False
+        return True
+
+
+class MiAZConfigSnapshot:
+    """
+    Immutable lookup tables of a config at a given version: value ->
+    description (available and used values) and the set of used keys.
+    """
+    __slots__ = ('config_for', 'version', 'descriptions', 'used')
+
+    def __init__(self, config_for: str, version: int, available: dict, used: dict):
+        descriptions = dict(available)
+        descriptions.update(used)
+        self.config_for = config_for
+        self.version = version
+        self.descriptions = MappingProxyType(descriptions)
+        self.used = frozenset(used)
+
+    def __repr__(self):
+        return f"{__class__.__name__}({self.config_for}, version={self.version}, used={len(self.used)})"
+
+    def describe(self, key: str) -> str:
+        """Return the description of a value, or the value itself"""
+        return self.descriptions.get(key, key)
+
+    def is_used(self, key: str) -> bool:
+        return key in self.used
+
 
 class MiAZConfig(GObject.GObject):
-    """ MiAZ Config class"""
+    """ MiAZ Config class
+
+    Changes are applied to the in-memory items immediately and written
+    to disk later (write-behind): all changes to a file made within
+    WRITE_DELAY ms end up in a single atomic write. Call flush() (or
+    MiAZConfig.flush_all()) when files must be on disk, or save with
+    now=True to write at once and get the result. When a deferred write
+    fails, 'save-failed' is emitted by the config that made the change.
+
+    In-memory items and pending writes are kept per file and shared by
+    every config using it (eg.: People, SentBy and SentTo all use the
+    people available file), so one config never writes over changes
+    made through another.
+    """
     __gsignals__ = {
         'available-updated': (GObject.SignalFlags.RUN_LAST, None, ()),
         'used-updated': (GObject.SignalFlags.RUN_LAST, None, ()),
+        'save-failed': (GObject.SignalFlags.RUN_LAST, None, (str,)),
     }
     used = None
     default = None
+    _files = {}         # Filepath -> {'changed': bool, 'items': dict}
+    _pending = {}       # Filepath -> (config writing it, items) not written yet
+    _sharing = {}       # Filepath -> configs using the file (weak references)
 
     def __init__(self, app, log, config_for, used=None, available=None, default=None, model=MiAZModel, must_copy=True, foreign=False):
         super().__init__()
@@ -37,7 +203,20 @@ class MiAZConfig(GObject.GObject):
         self.model = model
         self.must_copy = must_copy
         self.foreign = foreign
-        self.cache = {}
+        self.cache = MiAZConfig._files
+        self._flush_source = 0
+        self._version = 0
+        self._snapshot = None
+        self.store = MiAZConfigStore.lookup(used) if used is not None else None
+        for filepath in (used, available):
+            if filepath is None:
+                continue
+            MiAZConfig._sharing.setdefault(filepath, weakref.WeakSet()).add(self)
+            # Read again from disk (or store) unless a write is pending
+            if filepath not in MiAZConfig._pending:
+                self.cache.pop(filepath, None)
+        self.connect('available-updated', self._on_config_updated)
+        self.connect('used-updated', self._on_config_updated)
         self.setup()
 
     def __repr__(self):
@@ -51,8 +230,13 @@ class MiAZConfig(GObject.GObject):
         self.log.debug(f"\tConfig for available: {self.available}")
 
 
+    def _exists(self, filepath: str) -> bool:
+        if self.store is not None and self.store.contains(filepath):
+            return True
+        return os.path.exists(filepath)
+
     def setup(self):
-        if not os.path.exists(self.available):
+        if not self._exists(self.available):
             if self.default is not None:
                 try:
                     shutil.copy(self.default, self.available)
@@ -70,13 +254,36 @@ class MiAZConfig(GObject.GObject):
                 self.log.debug(f"{self.config_for} - Available configuration file created (empty)")
                 self.log.debug(f"{self.config_for} - Config file path: {self.available}")
 
-        if not os.path.exists(self.used):
+        if not self._exists(self.used):
             self.save(filepath=self.used, items={})
             self.log.debug(f"{self.config_for} - Used configuration file created (empty)")
 
+        # New files must exist right away
+        if self._get_pending():
+            self.flush()
+
     def get_config_for(self):
         return self.config_for
 
+    def get_version(self) -> int:
+        """Version of the config. It changes whenever items change."""
+        return self._version
+
+    def _on_config_updated(self, *args):
+        self._version += 1
+
+    def snapshot(self) -> MiAZConfigSnapshot:
+        """
+        Return an immutable snapshot of the config. The same object is
+        returned until the config changes, so consumers can keep it and
+        compare versions.
+        """
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.version != self._version:
+            snapshot = MiAZConfigSnapshot(self.config_for, self._version, self.load_available(), self.load_used())
+            self._snapshot = snapshot
+        return snapshot
+
     def get_used(self):
         return self.used
 
@@ -97,7 +304,13 @@ class MiAZConfig(GObject.GObject):
         if config_changed:
             # ~ self.log.debug(f"Loading {self.config_for} items from disk ({filepath})!!")
             try:
-                items = util.json_load(filepath)
+                items = None
+                if self.store is not None:
+                    items = self.store.get(filepath)
+                if items is None:
+                    items = util.json_load(filepath)
+                    if self.store is not None:
+                        self.store.migrate(filepath, items)
                 self.cache[filepath] = {}
                 self.cache[filepath]['changed'] = False
                 self.cache[filepath]['items'] = items
@@ -119,22 +332,16 @@ class MiAZConfig(GObject.GObject):
         # ~ self.log.debug(f"{self.config_for} used: {self.used}")
         return self.load(self.used)
 
-    def save(self, filepath: str = '', items: dict = None) -> bool:
+    def save(self, filepath: str = '', items: dict = None, now: bool = False) -> bool:
         if items is None:
             items = {}
-        saved = self.save_data(filepath, items)
+        saved = self.save_data(filepath, items, now)
         if saved:
             if filepath == self.available:
                 self.emit('available-updated')
             elif filepath == self.used:
                 self.log.debug(f"Signal emitted after saving used config for {self.config_for}")
                 self.emit('used-updated')
-            try:
-                self.cache[filepath]['changed'] = True
-            except KeyError:
-                self.cache[filepath] = {}
-                self.cache[filepath]['changed'] = True
-            # ~ self.log.debug(f"Cache update for '{filepath}'")
         return saved
 
     def save_available(self, items: dict = None) -> bool:
@@ -147,19 +354,79 @@ class MiAZConfig(GObject.GObject):
             items = {}
         return self.save(self.used, items)
 
-    def save_data(self, filepath: str = '', items: dict = None) -> bool:
+    def save_data(self, filepath: str = '', items: dict = None, now: bool = False) -> bool:
+        """Update in-memory items and write them to disk.
+
+        With now=True the file is written at once and the result of the
+        write is returned. Otherwise the write is scheduled and True is
+        returned. A deferred write that fails is logged, emits
+        'save-failed' (filepath) and stays pending for the next flush(),
+        which returns False.
+        """
         if items is None:
             items = {}
-        util = self.app.get_service('util')
         if filepath == '':
             filepath = self.used
+        # Cache stays valid: no need to read back our own writes
+        self.cache[filepath] = {'changed': False, 'items': items}
+        MiAZConfig._pending[filepath] = (self, items)
+        for config in MiAZConfig._sharing.get(filepath, ()):
+            if config is not self:
+                config._version += 1
+        self._version += 1
+        if now:
+            return self._write(filepath)
+        if not self._flush_source:
+            self._flush_source = GLib.timeout_add(WRITE_DELAY, self._on_flush_timeout)
+        return True
+
+    def _on_flush_timeout(self):
+        self._flush_source = 0
+        self.flush()
+        return False
+
+    def _get_pending(self) -> list:
+        """Pending files written by this config or used by it"""
+        mine = (self.used, self.available)
+        return [filepath for filepath, (config, items) in MiAZConfig._pending.items()
+                if config is self or filepath in mine]
+
+    def flush(self) -> bool:
+        """Write pending changes to disk now. Return False if any file
+        could not be written (it stays pending)."""
+        if self._flush_source:
+            GLib.source_remove(self._flush_source)
+            self._flush_source = 0
+        saved = True
+        for filepath in self._get_pending():
+            saved = self._write(filepath) and saved
+        return saved
+
+    def _write(self, filepath: str) -> bool:
+        """Write the pending items of a file. On error, they stay pending
+        (unless changed meanwhile) and the writer emits 'save-failed'."""
+        util = self.app.get_service('util')
+        writer, items = MiAZConfig._pending.pop(filepath)
         try:
-            util.json_save(filepath, items)
-            saved = True
+            if writer.store is not None:
+                writer.store.save(filepath, items)
+            else:
+                util.json_save(filepath, items)
         except Exception as error:
-            self.log.error(error)
-            saved = False
-        return saved
+            self.log.error(f"{self.config_for} - Config {filepath} could not be saved: {error}")
+            MiAZConfig._pending.setdefault(filepath, (writer, items))
+            writer.emit('save-failed', filepath)
+            return False
+        return True
+
+    @classmethod
+    def flush_all(cls) -> bool:
+        """Write pending changes of every config to disk"""
+        saved = True
+        writers = {id(config): config for config, items in cls._pending.values()}
+        for config in writers.values():
+            saved = config.flush() and saved
+        return MiAZConfigStore.flush_all() and saved
 
     def get(self, key: str) -> str:
         config = self.load(self.used)
@@ -299,10 +566,10 @@ class MiAZConfigApp(MiAZConfig):
         config = self.load(self.used)
         return key in config
 
-    def save(self, filepath: str = '', items: dict = None) -> bool:
+    def save(self, filepath: str = '', items: dict = None, now: bool = False) -> bool:
         if items is None:
             items = {}
-        saved = self.save_data(filepath, items)
+        saved = self.save_data(filepath, items, now)
         if saved:
             self.emit('repo-settings-updated-app')
         return saved
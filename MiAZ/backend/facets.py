@@ -0,0 +1,114 @@
+#!/usr/bin/python3
+
+"""
+# File: facets.py
+# Author: Tomás Vírseda
+# License: GPL v3
+# Description: Facet counts for the workspace filters (no GTK involved)
+"""
+
+# Config section and document attribute of every faceted (and bitmap
+# indexed) field
+FACET_FIELDS = [('Country', 'country'), ('Group', 'group'), ('SentBy', 'sentby_id'), ('Purpose', 'purpose'), ('SentTo', 'sentto_id')]
+
+
+def popcount(bits: int) -> int:
+    return bin(bits).count('1')
+
+
+def facet_matches(selected: str, value: str) -> bool:
+    """Same semantics as the workspace dropdown filters"""
+    if selected is None or selected == 'Any':
+        return True
+    if selected == 'None':
+        return len(value) == 0
+    return selected.upper() == value.upper()
+
+
+class MiAZFacets:
+    """
+    Number of documents each dropdown entry would match.
+
+    The count of a value only applies the filters of the other fields,
+    so it is the number of documents displayed if that value was
+    selected. All fields are counted in a single pass: a document
+    failing no field filter counts for every field, a document failing
+    exactly one counts only for that field and the rest are skipped
+    without evaluating the remaining (more expensive) filters.
+    """
+
+    def __init__(self):
+        self.counts = {}    # Field -> {value (upper case) -> documents}
+        self.totals = {}    # Field -> documents matching the other filters
+        for skey, attr in FACET_FIELDS:
+            self.counts[skey] = {}
+            self.totals[skey] = 0
+
+    def compute(self, items, selected: dict, accept=None):
+        """Count items.
+
+        selected maps every field to the id selected in its dropdown.
+        accept is an optional callable telling whether an item passes
+        the rest of filters (search text, dates, plug-ins, ...).
+        """
+        fields = [(skey, attr, selected.get(skey)) for skey, attr in FACET_FIELDS]
+        counts = {skey: {} for skey, attr in FACET_FIELDS}
+        totals = dict.fromkeys(counts, 0)
+        for item in items:
+            values = []
+            failed = None
+            skip = False
+            for skey, attr, sel in fields:
+                value = getattr(item, attr)
+                values.append(value)
+                if not facet_matches(sel, value):
+                    if failed is not None:
+                        skip = True
+                        break
+                    failed = skey
+            if skip or (accept is not None and not accept(item)):
+                continue
+            for (skey, attr, sel), value in zip(fields, values):
+                if failed is None or failed == skey:
+                    key = value.upper()
+                    table = counts[skey]
+                    table[key] = table.get(key, 0) + 1
+                    totals[skey] += 1
+        self.counts = counts
+        self.totals = totals
+        return self
+
+    def compute_bitmap(self, index, base: int, selected: dict):
+        """Count from a MiAZBitmapIndex.
+
+        base is the bitset of documents passing the rest of filters.
+        Every count is the size of an intersection of bitsets, so no
+        document is visited.
+        """
+        bits = {skey: index.field(skey, selected.get(skey)) for skey, attr in FACET_FIELDS}
+        counts = {}
+        totals = {}
+        for skey, attr in FACET_FIELDS:
+            others = base
+            for other, other_bits in bits.items():
+                if other != skey and other_bits is not None:
+                    others &= other_bits
+            table = {}
+            if others:
+                for value, value_bits in index.values(skey).items():
+                    count = popcount(others & value_bits)
+                    if count > 0:
+                        table[value] = count
+            counts[skey] = table
+            totals[skey] = popcount(others)
+        self.counts = counts
+        self.totals = totals
+        return self
+
+    def get(self, field: str, key: str) -> int:
+        """Documents matched if key was selected in the field dropdown"""
+        if key == 'Any':
+            return self.totals.get(field, 0)
+        if key == 'None':
+            key = ''
+        return self.counts.get(field, {}).get(key.upper(), 0)
@@ -0,0 +1,96 @@
+#!/usr/bin/python3
+
+"""
+# File: filters.py
+# Author: Tomás Vírseda
+# License: GPL v3
+# Description: Workspace filter chain (no GTK involved)
+"""
+
+from time import perf_counter
+
+# One call out of SAMPLE_RATE evaluates and times every filter
+SAMPLE_RATE = 64
+
+
+class MiAZFilterStats:
+    """Measures of a filter, taken from sampled calls"""
+    __slots__ = ('calls', 'passed', 'elapsed')
+
+    def __init__(self):
+        self.calls = 0
+        self.passed = 0
+        self.elapsed = 0.0      # Seconds
+
+    def rank(self) -> float:
+        """Expected cost per rejected item. Lower runs first."""
+        if self.calls == 0:
+            return 0.0
+        cost = self.elapsed / self.calls
+        rejected = (self.calls - self.passed) / self.calls
+        return cost / max(rejected, 1e-6)
+
+    def as_dict(self) -> dict:
+        return {'calls': self.calls, 'passed': self.passed, 'elapsed': self.elapsed}
+
+
+class MiAZFilterChain:
+    """
+    Flat, short-circuiting predicate over the workspace filters.
+
+    The chain is compiled once per filter change: filters are sorted
+    by their measured cost per rejected item, so cheap and selective
+    filters run first. Regular calls only run the filters until one
+    rejects the item. Sampled calls run (and time) all of them, which
+    is how pass rates and costs are measured.
+    """
+
+    def __init__(self):
+        self.stats = {}         # Filter name -> MiAZFilterStats
+        self._names = ()
+        self._funcs = ()
+        self._count = 0
+
+    def compile(self, filters: dict):
+        """Compile the chain from a dictionary (name -> callback)"""
+        for name in list(self.stats):
+            if name not in filters:
+                del self.stats[name]
+        for name in filters:
+            if name not in self.stats:
+                self.stats[name] = MiAZFilterStats()
+        ordered = sorted(filters.items(), key=lambda entry: self.stats[entry[0]].rank())
+        self._names = tuple(name for name, func in ordered)
+        self._funcs = tuple(func for name, func in ordered)
+        self._count = 0
+        return self
+
+    def get_order(self) -> tuple:
+        return self._names
+
+    def get_stats(self) -> dict:
+        return {name: self.stats[name].as_dict() for name in self._names}
+
+    def __call__(self, item, filter_list_model) -> bool:
+        self._count += 1
+        if self._count == SAMPLE_RATE:
+            self._count = 0
+            return self._sample(item, filter_list_model)
+        for func in self._funcs:
+            if not func(item, filter_list_model):
+                return False
+        return True
+
+    def _sample(self, item, filter_list_model) -> bool:
+        show_item = True
+        for name, func in zip(self._names, self._funcs):
+            start = perf_counter()
+            result = func(item, filter_list_model)
+            stats = self.stats[name]
+            stats.elapsed += perf_counter() - start
+            stats.calls += 1
+            if result:
+                stats.passed += 1
+            else:
+                show_item = False
+        return show_item
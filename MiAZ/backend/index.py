@@ -0,0 +1,262 @@
+#!/usr/bin/python3
+
+"""
+# File: index.py
+# Author: Tomás Vírseda
+# License: GPL v3
+# Description: Persistent columnar index of repository documents
+"""
+
+import os
+import sys
+import mmap
+import struct
+import threading
+from array import array
+
+from MiAZ.backend.log import MiAZLog
+
+INDEX_VERSION = 1
+INDEX_FILE = 'documents.idx'
+INDEX_MAGIC = b'MIAZIDX' + (b'L' if sys.byteorder == 'little' else b'B')
+
+# Dictionary-encoded columns (filename fields 1 to 6)
+COLUMNS = ['country', 'group', 'sentby', 'purpose', 'concept', 'sentto']
+
+# Row flags
+ROW_PARSED = 1  # Normalized name with a numeric date. Fields are in the index.
+
+HEADER = struct.Struct('<8sIII16s')   # magic, version, documents, sections, stamp
+SECTION = struct.Struct('<II')        # offset, length
+NSECTIONS = 3 + 2 * len(COLUMNS)      # names, flags, dates + (values, codes) per column
+
+
+def _pad(data: bytes) -> bytes:
+    return data + b'\0' * (-len(data) % 4)
+
+
+def _pack_strings(strings: list) -> bytes:
+    """Pack strings as: count, offsets[count + 1], utf-8 blob"""
+    offsets = array('I', [0])
+    blob = bytearray()
+    for string in strings:
+        blob += string.encode('utf-8', 'surrogateescape')
+        offsets.append(len(blob))
+    return _pad(struct.pack('<I', len(strings)) + offsets.tobytes() + bytes(blob))
+
+
+class MiAZStringTable:
+    """Read-only view over a packed string table inside the mapped file"""
+
+    def __init__(self, buffer: memoryview):
+        count = struct.unpack_from('<I', buffer)[0]
+        start = 4 + 4 * (count + 1)
+        self._count = count
+        self._offsets = buffer[4:start].cast('I')
+        self._blob = buffer[start:]
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, pos: int) -> str:
+        return str(self._blob[self._offsets[pos]:self._offsets[pos + 1]], 'utf-8', 'surrogateescape')
+
+    def to_list(self) -> list:
+        return [self[pos] for pos in range(self._count)]
+
+
+class MiAZDocumentIndex:
+    """
+    On-disk index with the parsed fields of every repository document.
+
+    The file lives in '<repo>/.conf' and is columnar: document names,
+    one flag byte and one date integer per document, and for each text
+    field a dictionary of distinct values plus one uint32 code per
+    document. Opening a repository maps the file instead of splitting
+    every filename again.
+
+    The index is tied to a scanner stamp (a digest of the document
+    names). When the stamp doesn't match, or the file is missing or has
+    another format version, it is considered stale and must be rebuilt.
+
+    Every instance maps the file on its own, so threads must not share
+    an instance. Rebuilding the file is serialized between instances.
+    """
+    _write_lock = threading.Lock()
+
+    def __init__(self, app=None):
+        self.app = app
+        self.log = MiAZLog('MiAZ.Index')
+        self._dirpath = None
+        self._stamp = None
+        self._mmap = None
+        self._count = 0
+        self._names = None
+        self._flags = None
+        self._dates = None
+        self._values = {}
+        self._codes = {}
+
+    def __len__(self):
+        return self._count
+
+    def _get_index_path(self, dirpath: str) -> str:
+        return os.path.join(dirpath, '.conf', INDEX_FILE)
+
+    def close(self):
+        if self._mmap is not None:
+            # Release every view before closing the map
+            self._names = self._flags = self._dates = None
+            self._codes = {}
+            try:
+                self._mmap.close()
+            except BufferError:
+                # A reader still holds a view. The map is released with it.
+                pass
+        self._mmap = None
+        self._dirpath = None
+        self._stamp = None
+        self._count = 0
+        self._values = {}
+
+    def open(self, dirpath: str, stamp: bytes) -> bool:
+        """Map the index of the given repository. Return False if stale."""
+        self.close()
+        filepath = self._get_index_path(dirpath)
+        try:
+            with open(filepath, 'rb') as fin:
+                mm = mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # Missing or empty file
+            return False
+
+        try:
+            magic, version, count, nsections, fstamp = HEADER.unpack_from(mm)
+            if magic != INDEX_MAGIC or version != INDEX_VERSION or nsections != NSECTIONS:
+                self.log.debug(f"Index {filepath} has another format. Rebuild needed")
+                mm.close()
+                return False
+            if fstamp != stamp:
+                self.log.debug(f"Index {filepath} is stale. Rebuild needed")
+                mm.close()
+                return False
+
+            buffer = memoryview(mm)
+            sections = []
+            for n in range(nsections):
+                offset, length = SECTION.unpack_from(mm, HEADER.size + n * SECTION.size)
+                sections.append(buffer[offset:offset + length])
+            self._names = MiAZStringTable(sections[0])
+            self._flags = sections[1][:count]
+            self._dates = sections[2].cast('I')
+            for n, column in enumerate(COLUMNS):
+                # Dictionaries are small: decode them once
+                self._values[column] = tuple(MiAZStringTable(sections[3 + 2 * n]).to_list())
+                self._codes[column] = sections[4 + 2 * n].cast('I')
+            del buffer, sections
+        except (struct.error, ValueError, TypeError) as error:
+            self.log.warning(f"Index {filepath} is corrupted: {error}")
+            self._names = self._flags = self._dates = None
+            self._values = {}
+            self._codes = {}
+            mm.close()
+            return False
+
+        self._mmap = mm
+        self._dirpath = dirpath
+        self._stamp = stamp
+        self._count = count
+        self.log.debug(f"Index {filepath} mapped ({count} documents)")
+        return True
+
+    def build(self, dirpath: str, names: list, stamp: bytes) -> bool:
+        """Parse document names, write the index atomically and map it."""
+        self.close()
+        flags = bytearray(len(names))
+        dates = array('I', bytes(4 * len(names)))
+        values = {column: {} for column in COLUMNS}
+        codes = {column: array('I', bytes(4 * len(names))) for column in COLUMNS}
+        for pos, name in enumerate(names):
+            dot = name.rfind('.')
+            doc = name[:dot] if dot > 0 else name
+            fields = doc.split('-')
+            if len(fields) != 7:
+                continue
+            date = fields[0]
+            if len(date) != 8 or not date.isdigit():
+                continue
+            flags[pos] = ROW_PARSED
+            dates[pos] = int(date)
+            for n, column in enumerate(COLUMNS):
+                table = values[column]
+                value = fields[n + 1]
+                try:
+                    code = table[value]
+                except KeyError:
+                    code = table[value] = len(table)
+                codes[column][pos] = code
+
+        sections = [_pack_strings(names), _pad(bytes(flags)), dates.tobytes()]
+        for column in COLUMNS:
+            sections.append(_pack_strings(list(values[column])))
+            sections.append(codes[column].tobytes())
+
+        header = HEADER.pack(INDEX_MAGIC, INDEX_VERSION, len(names), len(sections), stamp)
+        offset = HEADER.size + SECTION.size * len(sections)
+        directory = b''
+        for section in sections:
+            directory += SECTION.pack(offset, len(section))
+            offset += len(section)
+
+        filepath = self._get_index_path(dirpath)
+        tmpfile = f"{filepath}.tmp"
+        try:
+            with MiAZDocumentIndex._write_lock:
+                with open(tmpfile, 'wb') as fout:
+                    fout.write(header)
+                    fout.write(directory)
+                    for section in sections:
+                        fout.write(section)
+                os.replace(tmpfile, filepath)
+        except OSError as error:
+            self.log.error(f"Index {filepath} could not be saved: {error}")
+            return False
+        self.log.debug(f"Index {filepath} rebuilt ({len(names)} documents)")
+        return self.open(dirpath, stamp)
+
+    def load(self, dirpath: str, names: list, stamp: bytes) -> bool:
+        """Map the index, rebuilding it first when missing or stale."""
+        if self._dirpath == dirpath and self._stamp == stamp:
+            return True
+        if self.open(dirpath, stamp):
+            return True
+        return self.build(dirpath, names, stamp)
+
+    def get_values(self, column: str) -> tuple:
+        """Distinct values of a column (dictionary order)"""
+        return self._values.get(column, ())
+
+    def rows(self):
+        """
+        Yield (name, fields) for every document. fields is the list of
+        the seven filename fields, or None when the name couldn't be
+        parsed and the caller must handle it by itself.
+        """
+        names = self._names
+        flags = self._flags
+        dates = self._dates
+        columns = [(self._values[column], self._codes[column]) for column in COLUMNS]
+        datestr = {}
+        for pos in range(self._count):
+            name = names[pos]
+            if not flags[pos] & ROW_PARSED:
+                yield name, None
+                continue
+            date = dates[pos]
+            try:
+                fields = [datestr[date]]
+            except KeyError:
+                fields = [datestr.setdefault(date, '%08d' % date)]
+            for table, codes in columns:
+                fields.append(table[codes[pos]])
+            yield name, fields
@@ -11,6 +11,8 @@ from gettext import gettext as _
 
 from gi.repository import GObject
 
+from MiAZ.backend.columns import MiAZRow
+
 
 class MiAZModel(GObject.Object):
     """Custom MiAZ data model to be subclassed"""
@@ -34,10 +36,17 @@ class MiAZModel(GObject.Object):
 class MiAZItem(MiAZModel):
     """Custom data model for MiAZ use cases
     {timestamp}-{country}-{group}-{sentby}-{purpose}-{concept}-{sentto}.{extension}
+
+    Values are kept in a single document row (MiAZRow) of interned
+    strings, so items of documents sharing codes and descriptions share
+    them too. Sort keys come precomputed with the row. The search text
+    is built when asked for.
     """
     __gtype_name__ = 'MiAZItem'
     __title__ = 'MiAZItem'
 
+    _icon = ''
+
     def __init__(self, id: str,
                         date: str = '',
                         date_dsc: str = '',
@@ -57,107 +66,149 @@ class MiAZItem(MiAZModel):
                         valid: bool = False,
                         icon: str = '',
                         extension: str = '',
+                        row: MiAZRow = None,
                         ):
-        super().__init__(id, title)
-
-        self._date = date
-        self._date_dsc = date_dsc
-        self._country = country
-        self._country_dsc = country_dsc
-        self._group = group
-        self._group_dsc = group_dsc
-        self._purpose = purpose
-        self._purpose_dsc = purpose_dsc
-        self._sentby_id = sentby_id
-        self._sentby_dsc = sentby_dsc
-        self._subtitle = subtitle
-        self._sentto_id = sentto_id
-        self._sentto_dsc = sentto_dsc
-        self._active = active
-        self._valid = valid
-        self._icon = icon
-        self._extension = extension
-        self.search_text =  self.id + ' ' + date + ' ' + date_dsc + ' ' + group + ' ' + group_dsc + ' ' + \
-                            country + ' ' + country_dsc + ' ' + purpose + ' ' + purpose_dsc + ' ' + \
-                            sentby_id + ' ' + sentby_dsc + ' ' + title + ' ' + subtitle + ' ' + \
-                            sentto_id + ' ' + sentto_dsc + ' ' + extension
+        if row is None:
+            row = MiAZRow.new(id=id, date=date, date_dsc=date_dsc,
+                              country=country, country_dsc=country_dsc,
+                              group=group, group_dsc=group_dsc,
+                              sentby_id=sentby_id, sentby_dsc=sentby_dsc,
+                              purpose=purpose, purpose_dsc=purpose_dsc,
+                              title=title, subtitle=subtitle,
+                              sentto_id=sentto_id, sentto_dsc=sentto_dsc,
+                              extension=extension, active=active, valid=valid)
+        super().__init__(row.id, row.title)
+        self._row = row
+        if icon:
+            self._icon = icon
+
+    @classmethod
+    def from_row(cls, row: MiAZRow):
+        """Item of a document row. The row is shared, not copied."""
+        return cls(row.id, row=row)
+
+    @property
+    def row(self) -> MiAZRow:
+        return self._row
+
+    @property
+    def search_text(self) -> str:
+        return self._row.search_text
 
     @GObject.Property
     def date(self):
-        return self._date
+        return self._row.date
 
     @GObject.Property
     def date_dsc(self):
-        return self._date_dsc
+        return self._row.date_dsc
 
     @GObject.Property
     def country(self):
-        return self._country
+        return self._row.country
 
     @GObject.Property
     def extension(self):
-        return self._extension
+        return self._row.extension
 
     @GObject.Property
     def country_dsc(self):
-        return self._country_dsc
+        return self._row.country_dsc
 
     @GObject.Property
     def group(self):
-        return self._group
+        return self._row.group
 
     @GObject.Property
     def group_dsc(self):
-        return self._group_dsc
+        return self._row.group_dsc
 
     @GObject.Property
     def purpose(self):
-        return self._purpose
+        return self._row.purpose
 
     @GObject.Property
     def purpose_dsc(self):
-        return self._purpose_dsc
+        return self._row.purpose_dsc
 
     @GObject.Property
     def sentby_id(self):
-        return self._sentby_id
+        return self._row.sentby_id
 
     @GObject.Property
     def sentto_id(self):
-        return self._sentto_id
+        return self._row.sentto_id
 
     @GObject.Property
     def sentby_dsc(self):
-        return self._sentby_dsc
+        return self._row.sentby_dsc
 
     @GObject.Property
     def sentto_dsc(self):
-        return self._sentto_dsc
+        return self._row.sentto_dsc
 
     @GObject.Property
     def subtitle(self):
-        return self._subtitle
+        return self._row.subtitle
 
     @GObject.Property(type=bool, default=False)
     def active(self):
-        return self._active
+        return self._row.active
 
     @active.setter
     def active(self, active):
-        self._active = active
+        self._row = self._row._replace(active=active)
 
     @GObject.Property(type=bool, default=False)
     def valid(self):
-        return self._valid
+        return self._row.valid
 
     @valid.setter
     def valid(self, valid):
-        self._valid = valid
+        self._row = self._row._replace(valid=valid)
 
     @GObject.Property
     def icon(self):
         return self._icon
 
+    # Sort keys, precomputed by the row (see MiAZRow.new)
+
+    @GObject.Property(type=int, default=0)
+    def sort_date(self):
+        return self._row.sort_date
+
+    @GObject.Property(type=str)
+    def sort_country(self):
+        return self._row.sort_country
+
+    @GObject.Property(type=str)
+    def sort_group(self):
+        return self._row.sort_group
+
+    @GObject.Property(type=str)
+    def sort_purpose(self):
+        return self._row.sort_purpose
+
+    @GObject.Property(type=str)
+    def sort_extension(self):
+        return self._row.sort_extension
+
+    @GObject.Property(type=str)
+    def sort_title(self):
+        return self._row.sort_title
+
+    @GObject.Property(type=str)
+    def sort_concept(self):
+        return self._row.sort_concept
+
+    @GObject.Property(type=str)
+    def sort_sentby(self):
+        return self._row.sort_sentby
+
+    @GObject.Property(type=str)
+    def sort_sentto(self):
+        return self._row.sort_sentto
+
 
 class Concept(MiAZModel):
     __gtype_name__ = 'Concept'
@@ -0,0 +1,183 @@
+#!/usr/bin/python3
+
+"""
+# File: pipeline.py
+# Author: Tomás Vírseda
+# License: GPL v3
+# Description: Document classification pipeline (no GTK involved)
+"""
+
+from datetime import datetime
+
+from MiAZ.backend.columns import MiAZRow
+
+# Config section and filename field position
+KEY_FIELDS = [('Date', 0), ('Country', 1), ('Group', 2), ('SentBy', 3), ('Purpose', 4), ('Concept', 5), ('SentTo', 6)]
+
+# Fields whose value must be enabled in the repository config
+CONFIG_FIELDS = [(skey, nkey) for skey, nkey in KEY_FIELDS if nkey not in (0, 5)]
+
+# Documents classified between cancellation checks
+CANCEL_CHECK = 1000
+
+
+def get_config_snapshot(app) -> dict:
+    """
+    Return the config snapshot (MiAZConfigSnapshot) of every classified
+    field.
+
+    Must be called from the main thread. The result can be handed over
+    to a MiAZPipeline running anywhere else.
+    """
+    snapshot = {}
+    for skey, nkey in CONFIG_FIELDS:
+        snapshot[skey] = app.get_config(skey).snapshot()
+    return snapshot
+
+
+def get_config_version(config: dict) -> tuple:
+    """Versions of a config snapshot. Equal versions, same results."""
+    return tuple(config[skey].version for skey, nkey in CONFIG_FIELDS)
+
+
+def date_human_simple(value: str) -> str:
+    try:
+        return datetime.strptime(value, "%Y%m%d").strftime("%d/%m/%Y")
+    except ValueError:
+        return None
+
+
+class MiAZPipelineResult:
+    """Classified documents"""
+
+    def __init__(self):
+        self.items = {}     # Document name -> MiAZRow
+        self.invalid = []   # Names not following the MiAZ filename format
+
+    def __len__(self):
+        return len(self.items)
+
+
+class MiAZPipeline:
+    """
+    Turn document names into document rows (MiAZRow).
+
+    It splits the filename, describes the date, looks up every field in
+    a frozen config snapshot (see get_config_snapshot) and flags
+    documents as active when all their values are enabled. It doesn't
+    use GTK widgets nor app services, so it can be benchmarked without
+    a display and run from a worker thread.
+    """
+
+    def __init__(self, config: dict, dates: dict = None):
+        self.config = config
+        # Date descriptions cache. It may be shared between runs.
+        self.dates = dates if dates is not None else {}
+
+    def build_item(self, filename: str, fields: list = None):
+        """Classify a document and return (MiAZRow, valid).
+
+        fields can be passed when the name has already been split (eg.:
+        when read from the document index).
+        """
+        dot = filename.rfind('.')
+        doc = filename[:dot] if dot > 0 else filename
+        extension = filename[dot + 1:]
+        if fields is None:
+            fields = doc.split('-')
+        if len(fields) != 7:
+            item = MiAZRow.new(
+                        id=filename,
+                        title=doc,
+                        subtitle='_'.join(fields),
+                        extension=extension,
+                        active=False
+                    )
+            return item, False
+
+        active = True
+        date = fields[0]
+        try:
+            date_dsc = self.dates[date]
+        except KeyError:
+            date_dsc = date_human_simple(date)
+            if date_dsc is None:
+                active = False
+                date_dsc = ''
+            else:
+                self.dates[date] = date_dsc
+
+        desc = {}
+        for skey, nkey in CONFIG_FIELDS:
+            key = fields[nkey]
+            snapshot = self.config[skey]
+            desc[skey] = snapshot.descriptions.get(key, key)
+            if key not in snapshot.used:
+                active = False
+
+        item = MiAZRow.new(
+                    id=filename,
+                    date=date,
+                    date_dsc=date_dsc,
+                    country=fields[1],
+                    country_dsc=desc['Country'],
+                    group=fields[2],
+                    group_dsc=desc['Group'],
+                    sentby_id=fields[3],
+                    sentby_dsc=desc['SentBy'],
+                    purpose=fields[4],
+                    purpose_dsc=desc['Purpose'],
+                    title=doc,
+                    subtitle=fields[5].replace('_', ' '),
+                    sentto_id=fields[6],
+                    sentto_dsc=desc['SentTo'],
+                    extension=extension,
+                    active=active,
+                    valid=True
+                )
+        return item, True
+
+    def classify_rows(self, rows, cancellable=None, previous=None) -> MiAZPipelineResult:
+        """Classify (name, fields) pairs. fields may be None.
+
+        cancellable is an optional threading.Event. When it is set, the
+        run stops and None is returned.
+
+        previous is an optional dictionary (name -> MiAZRow) from an
+        earlier run. Items that didn't change are reused, so views can
+        tell which documents really changed.
+        """
+        result = MiAZPipelineResult()
+        for pos, (filename, fields) in enumerate(rows):
+            if cancellable is not None and pos % CANCEL_CHECK == 0 and cancellable.is_set():
+                return None
+            item, valid = self.build_item(filename, fields)
+            if previous is not None:
+                old = previous.get(filename)
+                if old is not None and old == item:
+                    item = old
+            result.items[filename] = item
+            if not valid:
+                result.invalid.append(filename)
+        return result
+
+    def classify(self, filenames, cancellable=None) -> MiAZPipelineResult:
+        """Classify document names"""
+        return self.classify_rows(((filename, None) for filename in filenames), cancellable)
+
+    @staticmethod
+    def summarize(items):
+        """Return (active concepts, inactive concepts, documents to review)"""
+        concepts_active = set()
+        concepts_inactive = set()
+        review = 0
+        for item in items:
+            if not item.active:
+                review += 1
+            if not item.valid:
+                continue
+            if item.active:
+                concepts_active.add(item.subtitle)
+            else:
+                concepts_inactive.add(item.subtitle)
+        return concepts_active, concepts_inactive, review
@@ -22,6 +22,7 @@ from MiAZ.backend.config import MiAZConfigPeople
 from MiAZ.backend.config import MiAZConfigSentBy
 from MiAZ.backend.config import MiAZConfigSentTo
 from MiAZ.backend.config import MiAZConfigPlugins
+from MiAZ.backend.config import MiAZConfigStore
 
 
 class MiAZRepository(GObject.GObject):
@@ -128,6 +129,14 @@ class MiAZRepository(GObject.GObject):
     def load(self, path=None):
         self._conf_cache = None
         repo_dir_conf = self.get('dir_conf')
+
+        # Optional consolidated config store (one read per switch)
+        MiAZConfigStore.unregister_all()
+        if self.config['App'].get('config_store'):
+            store = MiAZConfigStore(self.app, repo_dir_conf)
+            store.load()
+            MiAZConfigStore.register(store)
+
         self.config['Country'] = MiAZConfigCountries(self.app, repo_dir_conf)
         self.config['Group'] = MiAZConfigGroups(self.app, repo_dir_conf)
         self.config['Purpose'] = MiAZConfigPurposes(self.app, repo_dir_conf)
@@ -0,0 +1,332 @@
+#!/usr/bin/python3
+
+"""
+# File: scanner.py
+# Author: Tomás Vírseda
+# License: GPL v3
+# Description: Incremental repository scanner
+"""
+
+import os
+import json
+import hashlib
+import threading
+
+from MiAZ.backend.log import MiAZLog
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_FILE = 'snapshot.json'
+JOURNAL_SIZE = 32
+
+
+class MiAZChangeSet:
+    """Documents added, removed, modified or renamed between two scans.
+
+    All entries are document names (no directory part). Renames are
+    (old, new) pairs.
+    """
+
+    def __init__(self, added=None, removed=None, modified=None, renamed=None):
+        self.added = added if added is not None else []
+        self.removed = removed if removed is not None else []
+        self.modified = modified if modified is not None else []
+        self.renamed = renamed if renamed is not None else []
+
+    def __repr__(self):
+        return f"{__class__.__name__}(added={len(self.added)}, removed={len(self.removed)}, modified={len(self.modified)}, renamed={len(self.renamed)})"
+
+    def __bool__(self):
+        return not self.is_empty()
+
+    def is_empty(self) -> bool:
+        return not (self.added or self.removed or self.modified or self.renamed)
+
+    def detect_renames(self, before: dict, after: dict):
+        """
+        Turn removed/added pairs into renames when they are the same
+        file: same inode (and size), or same size and mtime when inodes
+        are not available (eg.: some remote filesystems). Only unique
+        matches are paired. before and after map names to
+        (size, mtime, inode) tuples.
+        """
+        if not (self.added and self.removed):
+            return self
+        by_inode = {}
+        by_stat = {}
+        for name in self.added:
+            size, mtime, inode = after[name]
+            if inode:
+                by_inode.setdefault((inode, size), []).append(name)
+            by_stat.setdefault((size, mtime), []).append(name)
+
+        removed_stats = {}
+        for old in self.removed:
+            size, mtime, inode = before[old]
+            removed_stats[(size, mtime)] = removed_stats.get((size, mtime), 0) + 1
+
+        paired = set()
+        removed = []
+        for old in self.removed:
+            size, mtime, inode = before[old]
+            candidates = by_inode.get((inode, size)) if inode else None
+            if not candidates and removed_stats[(size, mtime)] == 1:
+                candidates = by_stat.get((size, mtime))
+            if candidates and len(candidates) == 1 and candidates[0] not in paired:
+                new = candidates[0]
+                paired.add(new)
+                self.renamed.append((old, new))
+            else:
+                removed.append(old)
+        self.removed = removed
+        self.added = [name for name in self.added if name not in paired]
+        self.renamed.sort()
+        return self
+
+    @classmethod
+    def merge(cls, changesets: list):
+        """Collapse consecutive change sets into their net effect."""
+        batch = MiAZChangeBatch()
+        for changes in changesets:
+            for name in changes.removed:
+                batch.remove(name)
+            for old, new in changes.renamed:
+                batch.rename(old, new)
+            for name in changes.added:
+                batch.add(name)
+            for name in changes.modified:
+                batch.modify(name)
+        return batch.get_changes()
+
+
+class MiAZChangeBatch:
+    """
+    Accumulate single file events and keep only their net effect,
+    relative to the state before the first event. Eg.: a document
+    added and then removed is not reported at all, and a chain of
+    renames is reported as a single one.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def __bool__(self):
+        return bool(self._added or self._removed or self._modified or self._renamed)
+
+    def clear(self):
+        self._added = set()
+        self._removed = set()
+        self._modified = set()
+        self._renamed = {}  # new name -> original name
+
+    def add(self, name: str):
+        if name in self._removed:
+            self._removed.discard(name)
+            self._modified.add(name)
+        elif name not in self._renamed:
+            self._added.add(name)
+
+    def remove(self, name: str):
+        if name in self._added:
+            self._added.discard(name)
+        elif name in self._renamed:
+            self._removed.add(self._renamed.pop(name))
+        else:
+            self._modified.discard(name)
+            self._removed.add(name)
+
+    def modify(self, name: str):
+        if name not in self._added and name not in self._renamed:
+            self._modified.add(name)
+
+    def rename(self, old: str, new: str):
+        if old == new:
+            self.modify(new)
+            return
+        # The target name is replaced. A document renamed to it before
+        # is lost, so its original name is reported removed.
+        self._removed.discard(new)
+        self._added.discard(new)
+        self._modified.discard(new)
+        if new in self._renamed:
+            self._removed.add(self._renamed.pop(new))
+        if old in self._added:
+            self._added.discard(old)
+            self._added.add(new)
+        elif old in self._renamed:
+            origin = self._renamed.pop(old)
+            if origin == new:
+                self._modified.add(new)
+            else:
+                self._renamed[new] = origin
+        else:
+            self._modified.discard(old)
+            self._renamed[new] = old
+
+    def get_changes(self) -> MiAZChangeSet:
+        renamed = sorted((old, new) for new, old in self._renamed.items())
+        return MiAZChangeSet(sorted(self._added), sorted(self._removed), sorted(self._modified), renamed)
+
+
+class MiAZScanner:
+    """
+    Scan a repository directory and report what changed since the
+    previous scan.
+
+    Entries are read with os.scandir, so the file type comes from the
+    directory entry itself and only one stat call per document is
+    needed to fill the (size, mtime, inode) snapshot. The snapshot is
+    persisted in the repository '.conf' directory, so changes made
+    while the app was closed are reported by the first scan.
+
+    Every scan with changes bumps a generation counter and is kept in
+    a short journal. Consumers remember the generation they last saw
+    and ask for changes_since() it, so one scan feeds all of them.
+
+    The scanner can be used from worker threads.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self.log = MiAZLog('MiAZ.Scanner')
+        self._snapshots = {}    # dirpath -> {name: (size, mtime, inode)}
+        self._generations = {}  # dirpath -> int
+        self._journals = {}     # dirpath -> [(generation, MiAZChangeSet)]
+        self._scanned = set()   # dirpaths scanned during this session
+        self._stamps = {}       # dirpath -> (generation, digest)
+        self._lock = threading.RLock()
+
+    def _get_snapshot_path(self, dirpath: str) -> str:
+        return os.path.join(dirpath, '.conf', SNAPSHOT_FILE)
+
+    def _load_snapshot(self, dirpath: str) -> dict:
+        snapshot = {}
+        filepath = self._get_snapshot_path(dirpath)
+        try:
+            with open(filepath) as fin:
+                data = json.load(fin)
+            if data.get('version') == SNAPSHOT_VERSION:
+                for name, stat in data['files'].items():
+                    snapshot[name] = tuple(stat)
+            else:
+                self.log.debug(f"Snapshot format changed. Ignoring {filepath}")
+        except FileNotFoundError:
+            pass
+        except Exception as error:
+            self.log.warning(f"Snapshot {filepath} could not be loaded: {error}")
+        return snapshot
+
+    def _save_snapshot(self, dirpath: str, snapshot: dict):
+        filepath = self._get_snapshot_path(dirpath)
+        if not os.path.isdir(os.path.dirname(filepath)):
+            return
+        data = {'version': SNAPSHOT_VERSION, 'files': snapshot}
+        tmpfile = f"{filepath}.tmp"
+        try:
+            with open(tmpfile, 'w') as fout:
+                json.dump(data, fout, separators=(',', ':'))
+            os.replace(tmpfile, filepath)
+        except OSError as error:
+            self.log.error(f"Snapshot {filepath} could not be saved: {error}")
+
+    def _read_directory(self, dirpath: str) -> dict:
+        current = {}
+        with os.scandir(dirpath) as entries:
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                except OSError:
+                    # Deleted between readdir and stat
+                    continue
+                current[entry.name] = (stat.st_size, stat.st_mtime_ns, entry.inode())
+        return current
+
+    def get_snapshot(self, dirpath: str) -> dict:
+        """Return the last known snapshot, scanning once if needed."""
+        with self._lock:
+            if dirpath not in self._scanned:
+                self.scan(dirpath)
+            return self._snapshots.get(dirpath, {})
+
+    def get_files(self, dirpath: str) -> list:
+        """Return the sorted document names of the last snapshot."""
+        with self._lock:
+            return sorted(self.get_snapshot(dirpath))
+
+    def get_generation(self, dirpath: str) -> int:
+        return self._generations.get(dirpath, 0)
+
+    def get_stamp(self, dirpath: str) -> bytes:
+        """Digest of the document names in the snapshot.
+
+        Derived data that depends only on filenames (eg.: the document
+        index) stays valid as long as the stamp doesn't change.
+        """
+        with self._lock:
+            names = self.get_files(dirpath)
+            generation = self.get_generation(dirpath)
+            try:
+                sgen, stamp = self._stamps[dirpath]
+                if sgen == generation:
+                    return stamp
+            except KeyError:
+                pass
+            digest = hashlib.blake2b(digest_size=16)
+            for name in names:
+                digest.update(name.encode('utf-8', 'surrogateescape'))
+                digest.update(b'\0')
+            stamp = digest.digest()
+            self._stamps[dirpath] = (generation, stamp)
+            return stamp
+
+    def scan(self, dirpath: str) -> MiAZChangeSet:
+        """Read the directory and return the changes since last scan."""
+        with self._lock:
+            if dirpath not in self._snapshots:
+                self._snapshots[dirpath] = self._load_snapshot(dirpath)
+                self._generations[dirpath] = 0
+                self._journals[dirpath] = []
+            before = self._snapshots[dirpath]
+            try:
+                after = self._read_directory(dirpath)
+            except OSError as error:
+                self.log.error(f"Directory {dirpath} could not be scanned: {error}")
+                return MiAZChangeSet()
+
+            added = [name for name in after if name not in before]
+            removed = [name for name in before if name not in after]
+            modified = [name for name, stat in after.items() if name in before and before[name] != stat]
+            changes = MiAZChangeSet(added, removed, modified)
+
+            first = dirpath not in self._scanned
+            self._scanned.add(dirpath)
+            self._snapshots[dirpath] = after
+            if changes or first:
+                generation = self._generations[dirpath] + 1
+                self._generations[dirpath] = generation
+                journal = self._journals[dirpath]
+                journal.append((generation, changes))
+                del journal[:-JOURNAL_SIZE]
+                if changes:
+                    self._save_snapshot(dirpath, after)
+                    self.log.debug(f"Scanner > {dirpath}: {changes}")
+            return changes
+
+    def changes_since(self, dirpath: str, generation: int):
+        """
+        Return (generation, changes) with everything that happened after
+        the given generation. changes is None when the journal doesn't
+        go back that far and the consumer must rebuild from get_files().
+        """
+        with self._lock:
+            current = self.get_generation(dirpath)
+            if generation == current:
+                return current, MiAZChangeSet()
+            journal = self._journals.get(dirpath, [])
+            if generation <= 0 or not journal or journal[0][0] > generation + 1:
+                return current, None
+            pending = [changes for gen, changes in journal if gen > generation]
+            return current, MiAZChangeSet.merge(pending)
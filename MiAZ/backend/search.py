@@ -0,0 +1,211 @@
+#!/usr/bin/python3
+
+"""
+# File: search.py
+# Author: Tomás Vírseda
+# License: GPL v3
+# Description: Free-text search index (no GTK involved)
+"""
+
+import re
+from bisect import bisect_right
+
+# Everything but letters and digits separates tokens
+TOKEN_SEPARATOR = re.compile(r'[\W_]+')
+
+# Query results kept between index changes
+QUERY_CACHE = 64
+
+
+def tokenize(text: str) -> list:
+    """Normalized tokens of a text"""
+    return [token for token in TOKEN_SEPARATOR.split(text.upper()) if token]
+
+
+def narrows(query: str, other: str) -> bool:
+    """True if query other can only match documents matched by query.
+
+    Every term of query must be part of some term of other (eg.:
+    'inv' -> 'invoice', 'voice' -> 'invoice 2024').
+    """
+    terms = tokenize(other)
+    return all(any(part in term for term in terms) for part in tokenize(query))
+
+
+class MiAZSearchIndex:
+    """
+    Inverted index of document tokens.
+
+    Every document gets an ordinal. Tokens (upper case words of the
+    document search text) point to the ordinals of the documents
+    containing them. A query matches the documents where every query
+    term is part of some token (eg.: '0101' matches the date
+    '20240101'). Terms are looked up in the text of all distinct
+    tokens, which is much shorter than the text of all documents.
+
+    Unlike searching the whole document text, query terms are matched
+    separately: 'invoice 2024' also matches '2024-...-INVOICE'.
+
+    The index is updated by document, so only documents that changed
+    are tokenized again. A copy (eg.: to be updated from a worker
+    thread) shares the posting sets until either index changes them.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def copy(self):
+        """Independent copy. Posting sets are copied on first write."""
+        index = MiAZSearchIndex.__new__(MiAZSearchIndex)
+        index._ordinals = dict(self._ordinals)
+        index._names = list(self._names)
+        index._free = list(self._free)
+        index._doc_tokens = list(self._doc_tokens)
+        index._postings = dict(self._postings)
+        index._owned = set()
+        index._sorted = self._sorted
+        index._text = self._text
+        index._offsets = self._offsets
+        index._dirty = self._dirty
+        index._queries = {}
+        # Sets are shared now: neither index owns them anymore
+        self._owned = set()
+        return index
+
+    def clear(self):
+        self._ordinals = {}     # Document name -> ordinal
+        self._names = []        # Ordinal -> document name (None if free)
+        self._free = []         # Ordinals available for reuse
+        self._doc_tokens = []   # Ordinal -> tokens of the document
+        self._postings = {}     # Token -> set of ordinals
+        self._owned = set()     # Tokens whose set is not shared with a copy
+        self._sorted = []       # Sorted tokens
+        self._text = ''         # Sorted tokens, one per line
+        self._offsets = []      # Offset of every token in the text
+        self._dirty = False     # Sorted tokens must be rebuilt
+        self._queries = {}      # Query -> matching names (valid until next change)
+
+    def __len__(self):
+        return len(self._ordinals)
+
+    def __contains__(self, name: str):
+        return name in self._ordinals
+
+    def add(self, name: str, text: str):
+        """Index (or reindex) a document"""
+        tokens = frozenset(tokenize(text))
+        ordinal = self._ordinals.get(name)
+        if ordinal is not None:
+            if self._doc_tokens[ordinal] == tokens:
+                return
+            self._unlink(ordinal)
+        elif self._free:
+            ordinal = self._free.pop()
+            self._names[ordinal] = name
+        else:
+            ordinal = len(self._names)
+            self._names.append(name)
+            self._doc_tokens.append(None)
+        self._ordinals[name] = ordinal
+        self._doc_tokens[ordinal] = tokens
+        for token in tokens:
+            self._get_postings(token).add(ordinal)
+        self._queries = {}
+
+    def _get_postings(self, token: str) -> set:
+        """Posting set of a token, ready to be changed"""
+        try:
+            postings = self._postings[token]
+        except KeyError:
+            postings = self._postings[token] = set()
+            self._owned.add(token)
+            self._dirty = True
+            return postings
+        if token not in self._owned:
+            postings = self._postings[token] = set(postings)
+            self._owned.add(token)
+        return postings
+
+    def remove(self, name: str):
+        ordinal = self._ordinals.pop(name, None)
+        if ordinal is None:
+            return
+        self._unlink(ordinal)
+        self._names[ordinal] = None
+        self._doc_tokens[ordinal] = None
+        self._free.append(ordinal)
+        self._queries = {}
+
+    def _unlink(self, ordinal: int):
+        for token in self._doc_tokens[ordinal]:
+            postings = self._get_postings(token)
+            postings.discard(ordinal)
+            if not postings:
+                del self._postings[token]
+                self._owned.discard(token)
+                self._dirty = True
+
+    def update(self, previous: dict, current: dict):
+        """Apply the differences between two dictionaries of documents
+        (name -> MiAZRow). Rows are compared by identity."""
+        for name in previous:
+            if name not in current:
+                self.remove(name)
+        for name, item in current.items():
+            if previous.get(name) is not item or name not in self._ordinals:
+                self.add(name, item.search_text)
+        # Ready to be searched from another thread without changes
+        self._refresh()
+
+    def _refresh(self):
+        """Rebuild the text of tokens after tokens were added or removed"""
+        if not self._dirty:
+            return
+        self._sorted = sorted(self._postings)
+        self._text = '\n'.join(self._sorted)
+        self._offsets = []
+        offset = 0
+        for token in self._sorted:
+            self._offsets.append(offset)
+            offset += len(token) + 1
+        self._dirty = False
+
+    def _containing(self, term: str) -> set:
+        """Ordinals of documents with a token containing term"""
+        self._refresh()
+        ordinals = set()
+        tokens = self._sorted
+        offsets = self._offsets
+        text = self._text
+        # Terms have no separators, so a match never spans two tokens
+        pos = text.find(term)
+        while pos != -1:
+            index = bisect_right(offsets, pos) - 1
+            ordinals |= self._postings[tokens[index]]
+            pos = text.find(term, offsets[index] + len(tokens[index]) + 1)
+        return ordinals
+
+    def search(self, query: str):
+        """Return the names of matching documents, or None if the query
+        has no terms (everything matches)."""
+        terms = sorted(set(tokenize(query)), key=lambda term: (-len(term), term))
+        if not terms:
+            return None
+        key = tuple(terms)
+        try:
+            return self._queries[key]
+        except KeyError:
+            pass
+
+        # Longer terms first: they usually narrow the candidates most
+        candidates = None
+        for term in terms:
+            ordinals = self._containing(term)
+            candidates = ordinals if candidates is None else candidates & ordinals
+            if not candidates:
+                break
+        names = frozenset(self._names[ordinal] for ordinal in candidates)
+        if len(self._queries) > QUERY_CACHE:
+            self._queries = {}
+        self._queries[key] = names
+        return names
@@ -7,6 +7,7 @@
 # Description: Manage MiAZ stats
 """
 
+import os
 from gettext import gettext as _
 
 from gi.repository import GObject
@@ -25,8 +26,22 @@ Fields[Purpose] = 4
 Fields[Concept] = 5
 Fields[SentTo] = 6
 
+# Fields counted by value
+Counted = [Country, Group, SentBy, Purpose, SentTo]
+
 
 class MiAZStats(GObject.GObject):
+    """
+    Repository statistics: documents per year, month and day, and per
+    value of every field.
+
+    Aggregates are built once per repository and then maintained
+    incrementally from the util 'filename-*' signals and the watcher
+    change sets. Each document contribution is remembered, so the same
+    change reported by several sources is only counted once. Reading
+    the stats doesn't depend on the repository size, and 'stats-updated'
+    is only emitted when some aggregate changed.
+    """
     __gtype_name__ = 'MiAZStats'
     __gsignals__ = {
         "stats-updated": (GObject.SignalFlags.RUN_LAST, None, ()),
@@ -38,57 +53,146 @@ class MiAZStats(GObject.GObject):
         self.util = self.app.get_service('util')
         self.repository = self.app.get_service('repo')
         self.stats = {}
+        self._dirpath = None
+        self._docs = {}     # Document name -> (year, month, day, values)
+        self._dates = {}    # Date string -> (year, month, day) or None
+        self._watcher = None
+
+        # Translated keys are resolved once
+        self._date_key = _(Date.__title__)
+        self._year_key = _('year')
+        self._month_key = _('month')
+        self._day_key = _('day')
+        self._field_keys = [(_(prop.__title__), Fields[prop]) for prop in Counted]
+
+        self.util.connect('filename-added', self._on_filename_added)
+        self.util.connect('filename-deleted', self._on_filename_deleted)
+        self.util.connect('filename-renamed', self._on_filename_renamed)
+        self.repository.connect('repository-switched', self._on_repository_switched)
+
+    def _reset(self):
+        self.stats = {}
+        self.stats[self._date_key] = {}
+        self.stats[self._date_key][self._year_key] = {}
+        self.stats[self._date_key][self._month_key] = {}
+        self.stats[self._date_key][self._day_key] = {}
+        for key, pos in self._field_keys:
+            self.stats[key] = {}
+        self._docs = {}
 
     def _build(self, *args):
-        self.stats = {}
-        self.stats[_(Date.__title__)] = {}
-        self.stats[_(Date.__title__)][_('year')] = {}
-        self.stats[_(Date.__title__)][_('month')] = {}
-        self.stats[_(Date.__title__)][_('day')] = {}
-        self.stats[_(Country.__title__)] = {}
-        self.stats[_(Group.__title__)] = {}
-        self.stats[_(SentBy.__title__)] = {}
-        self.stats[_(Purpose.__title__)] = {}
-        self.stats[_(SentTo.__title__)] = {}
-
-        for document in self.util.get_files(self.repository.docs):
-            fields = self.util.get_fields(document)
-
-            # Date
-            adate = self.util.string_to_datetime(fields[0])
-            if adate is None:
-                continue
+        scanner = self.app.get_service('scanner')
+        dirpath = self.repository.docs
+        self._reset()
+        self._dirpath = dirpath
+        for document in scanner.get_files(dirpath):
+            self._add(document)
+        self.log.debug("Stats updated")
+        self.emit('stats-updated')
+
+    def _parse_date(self, value: str):
+        try:
+            return self._dates[value]
+        except KeyError:
+            pass
+        adate = self.util.string_to_datetime(value)
+        if adate is None:
+            parsed = None
+        else:
             year = str(adate.year)
             month = '%s%02d' % (year, adate.month)
             day = '%s%02d' % (month, adate.day)
-
-            try:
-                self.stats[_(Date.__title__)][_('year')][year] += 1
-            except KeyError:
-                self.stats[_(Date.__title__)][_('year')][year] = 1
-
-            try:
-                self.stats[_(Date.__title__)][_('month')][month] += 1
-            except KeyError:
-                self.stats[_(Date.__title__)][_('month')][month] = 1
-
-            try:
-                self.stats[_(Date.__title__)][_('day')][day] += 1
-            except KeyError:
-                self.stats[_(Date.__title__)][_('day')][day] = 1
-
-            # Rest of metadata
-            for prop in [Country, Group, SentBy, Purpose, SentTo]:
-                item = fields[Fields[prop]]
-                try:
-                    self.stats[_(prop.__title__)][item] += 1
-                except KeyError:
-                    self.stats[_(prop.__title__)][item] = 1
-
-        self.log.debug("Stats updated")
-        self.emit('stats-updated')
+            parsed = (year, month, day)
+        self._dates[value] = parsed
+        return parsed
+
+    def _count(self, table: dict, key: str, delta: int):
+        count = table.get(key, 0) + delta
+        if count > 0:
+            table[key] = count
+        else:
+            del table[key]
+
+    def _apply(self, record: tuple, delta: int):
+        year, month, day, values = record
+        dates = self.stats[self._date_key]
+        self._count(dates[self._year_key], year, delta)
+        self._count(dates[self._month_key], month, delta)
+        self._count(dates[self._day_key], day, delta)
+        for (key, pos), value in zip(self._field_keys, values):
+            self._count(self.stats[key], value, delta)
+
+    def _add(self, document: str) -> bool:
+        if document in self._docs:
+            return False
+        fields = self.util.get_fields(document)
+        if len(fields) != 7:
+            return False
+        date = self._parse_date(fields[0])
+        if date is None:
+            return False
+        record = date + (tuple(fields[pos] for key, pos in self._field_keys),)
+        self._docs[document] = record
+        self._apply(record, 1)
+        return True
+
+    def _remove(self, document: str) -> bool:
+        record = self._docs.pop(document, None)
+        if record is None:
+            return False
+        self._apply(record, -1)
+        return True
+
+    def _tracks(self, filepath: str) -> bool:
+        return self._dirpath is not None and os.path.dirname(filepath) == self._dirpath
+
+    def _changed(self, changed: bool):
+        if changed:
+            self.emit('stats-updated')
+
+    def _on_repository_switched(self, *args):
+        self._dirpath = None
+        self.stats = {}
+        self._docs = {}
+        watcher = self.app.get_service('watcher')
+        if watcher is not None and watcher is not self._watcher:
+            self._watcher = watcher
+            watcher.connect('repository-changed', self._on_repository_changed)
+
+    def _on_filename_added(self, util, target):
+        if self._tracks(target):
+            self._changed(self._add(os.path.basename(target)))
+
+    def _on_filename_deleted(self, util, filepaths):
+        changed = False
+        for filepath in filepaths:
+            if self._tracks(filepath):
+                changed |= self._remove(os.path.basename(filepath))
+        self._changed(changed)
+
+    def _on_filename_renamed(self, util, source, target):
+        changed = False
+        if self._tracks(source):
+            changed |= self._remove(os.path.basename(source))
+        if self._tracks(target):
+            changed |= self._add(os.path.basename(target))
+        self._changed(changed)
+
+    def _on_repository_changed(self, watcher, changes):
+        if self._dirpath is None or watcher.dirpath != self._dirpath:
+            return
+        changed = False
+        for name in changes.removed:
+            changed |= self._remove(name)
+        for old, new in changes.renamed:
+            changed |= self._remove(old)
+            changed |= self._add(new)
+        for name in changes.added:
+            changed |= self._add(name)
+        self._changed(changed)
 
     def get(self):
-        if not self.stats:
+        """Return the stats. They are only built once per repository."""
+        if self._dirpath != self.repository.docs:
             self._build()
         return self.stats
@@ -11,7 +11,6 @@ import os
 import re
 import ast
 import sys
-import glob
 import json
 import time
 import shutil
@@ -88,9 +87,10 @@ class MiAZUtil(GObject.GObject):
         self.app = app
         self._field_index = {}
         self._field_index_dir = None
-        self.connect('filename-added', self._invalidate_field_index)
-        self.connect('filename-deleted', self._invalidate_field_index)
-        self.connect('filename-renamed', self._invalidate_field_index)
+        self._field_index_generation = 0
+        self.connect('filename-added', self._on_field_index_added)
+        self.connect('filename-deleted', self._on_field_index_deleted)
+        self.connect('filename-renamed', self._on_field_index_renamed)
 
     def extract_variable_from_python_module(self, filepath, variable_name):
         with open(filepath, "r") as f:
@@ -129,32 +129,116 @@ class MiAZUtil(GObject.GObject):
         return adict
 
     def json_save(self, filepath: str, adict: {}) -> {}:
-        """Save dictionary into a file in json format"""
-        with open(filepath, 'w') as fout:
-            json.dump(adict, fout, sort_keys=True, indent=4)
+        """Save dictionary into a file in json format.
 
-    def _invalidate_field_index(self, *args):
-        self._field_index_dir = None
+        The file is replaced atomically: a crash never leaves it
+        truncated. The directory is synced too, so the new file (and
+        not the old one) is found after a crash.
+        """
+        tmpfile = f"{filepath}.tmp"
+        with open(tmpfile, 'w') as fout:
+            json.dump(adict, fout, sort_keys=True, indent=4)
+            fout.flush()
+            os.fsync(fout.fileno())
+        os.replace(tmpfile, filepath)
+        if os.name == 'posix':
+            dirfd = os.open(os.path.dirname(os.path.abspath(filepath)), os.O_RDONLY)
+            try:
+                os.fsync(dirfd)
+            finally:
+                os.close(dirfd)
+
+    def _field_index_add(self, doc: str):
+        fields = self.get_fields(doc)
+        if len(fields) < 7:
+            return
+        for field_type, idx in Field.items():
+            bucket = self._field_index[field_type]
+            try:
+                bucket[fields[idx]].add(doc)
+            except KeyError:
+                bucket[fields[idx]] = {doc}
+
+    def _field_index_remove(self, doc: str):
+        fields = self.get_fields(doc)
+        if len(fields) < 7:
+            return
+        for field_type, idx in Field.items():
+            bucket = self._field_index[field_type]
+            docs = bucket.get(fields[idx])
+            if docs is not None:
+                docs.discard(doc)
+                if not docs:
+                    del bucket[fields[idx]]
+
+    def _field_index_tracks(self, doc: str) -> bool:
+        return self._field_index_dir is not None and os.path.dirname(doc) == self._field_index_dir
+
+    def _on_field_index_added(self, util, target):
+        if self._field_index_tracks(target):
+            self._field_index_add(target)
+
+    def _on_field_index_deleted(self, util, filepaths):
+        for doc in filepaths:
+            if self._field_index_tracks(doc):
+                self._field_index_remove(doc)
+
+    def _on_field_index_renamed(self, util, source, target):
+        if self._field_index_tracks(source):
+            self._field_index_remove(source)
+        if self._field_index_tracks(target):
+            self._field_index_add(target)
 
     def _build_field_index(self, repo_dir):
+        scanner = self.app.get_service('scanner')
+        scanner.scan(repo_dir)
         self._field_index_dir = repo_dir
+        self._field_index_generation = scanner.get_generation(repo_dir)
         self._field_index = {ft: {} for ft in Field}
-        for doc in self.get_files(repo_dir):
-            fields = self.get_fields(doc)
-            if len(fields) < 7:
-                continue
-            for field_type, idx in Field.items():
-                val = fields[idx]
-                bucket = self._field_index[field_type]
-                if val not in bucket:
-                    bucket[val] = []
-                bucket[val].append(doc)
+        for name in scanner.get_files(repo_dir):
+            self._field_index_add(os.path.join(repo_dir, name))
 
-    def field_used(self, repo_dir, item_type, value):
+    def _sync_field_index(self, repo_dir):
+        """Bring the field index up to date with the repository.
+
+        Changes made through this class are applied in place by the
+        filename-* signal handlers. Changes found by the scanner (eg.:
+        files copied by hand into the repository) are applied from its
+        change set. The index is only rebuilt from scratch for another
+        repository or when the scanner journal is too short.
+        """
         if self._field_index_dir != repo_dir:
             self._build_field_index(repo_dir)
-        docs = self._field_index.get(item_type, {}).get(value, [])
-        return len(docs) > 0, docs
+            return
+        scanner = self.app.get_service('scanner')
+        generation, changes = scanner.changes_since(repo_dir, self._field_index_generation)
+        if changes is None:
+            self._build_field_index(repo_dir)
+            return
+        for name in changes.removed:
+            self._field_index_remove(os.path.join(repo_dir, name))
+        for old, new in changes.renamed:
+            self._field_index_remove(os.path.join(repo_dir, old))
+            self._field_index_add(os.path.join(repo_dir, new))
+        for name in changes.added:
+            self._field_index_add(os.path.join(repo_dir, name))
+        self._field_index_generation = generation
+
+    def field_used(self, repo_dir, item_type, value):
+        """Return (used, docs) for a field value. docs is a sorted copy."""
+        self._sync_field_index(repo_dir)
+        docs = self._field_index.get(item_type, {}).get(value, ())
+        return len(docs) > 0, sorted(docs)
+
+    def field_count(self, repo_dir, item_type, value) -> int:
+        """Number of documents using a field value"""
+        self._sync_field_index(repo_dir)
+        return len(self._field_index.get(item_type, {}).get(value, ()))
+
+    def field_counts(self, repo_dir, item_type) -> dict:
+        """Number of documents per value of a field"""
+        self._sync_field_index(repo_dir)
+        return {value: len(docs) for value, docs in self._field_index.get(item_type, {}).items()}
 
     def get_mimetype(self, filename: str) -> str:
         if sys.platform == 'win32':
@@ -182,8 +266,17 @@ class MiAZUtil(GObject.GObject):
         return filename.split('-')
 
     def get_files(self, dirpath: str) -> []:
-        """Get all files from a given directory."""
-        return sorted(f for f in glob.glob(os.path.join(dirpath, '*')) if os.path.isfile(f))
+        """Get all files from a given directory.
+
+        For repository directories, prefer the 'scanner' service, which
+        keeps a snapshot and reports only what changed.
+        """
+        files = []
+        with os.scandir(dirpath) as entries:
+            for entry in entries:
+                if not entry.name.startswith('.') and entry.is_file():
+                    files.append(entry.path)
+        return sorted(files)
 
     def get_files_recursively(self, root_dir: str) -> []:
         """Get documents from a given directory recursively
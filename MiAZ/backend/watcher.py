@@ -10,82 +10,91 @@
 # A modified version found on StackOverflow:
 # https://stackoverflow.com/questions/182197/how-do-i-watch-a-file-for-changes
 
-import glob
-
 from gi.repository import Gio
 from gi.repository import GLib
 from gi.repository import GObject
 
 from MiAZ.backend.log import MiAZLog
 from MiAZ.backend.status import MiAZStatus
+from MiAZ.backend.scanner import MiAZChangeSet, MiAZChangeBatch
+
+# Polling interval for remote repositories (seconds). It starts at the
+# floor and doubles on every idle cycle up to the ceiling.
+POLL_MIN = 2
+POLL_MAX = 60
+
+# File monitor events are delivered after this quiet period (ms)...
+DEBOUNCE = 300
+# ...or after this time at most, even if events keep arriving (ms)
+DEBOUNCE_MAX = 2000
 
 
 class MiAZWatcher(GObject.GObject):
     """
     Observe a given directory for file changes (added/renamed/deleted)
-    and emit the signal 'repository-updated' when it happens.
+    and emit the signal 'repository-updated' when it happens. The
+    signal 'repository-changed' is emitted too, carrying the
+    MiAZChangeSet, so listeners can apply the changes incrementally.
+
+    Local repositories are observed with a Gio.FileMonitor (inotify on
+    Linux). Events are coalesced into one batch per quiet period and
+    kept while the watcher is inactive, so nothing is lost.
+
+    Remote repositories (eg.: GVFS mounts) are polled. Each cycle first
+    queries the directory mtime and only enumerates its children when
+    it changed (or once per ceiling interval, as in-place modifications
+    don't touch the directory). The interval backs off exponentially
+    while the repository is idle. Scan costs are available with
+    get_scan_stats(). A latency can be injected to emulate a slow link
+    with a local directory.
     """
     __gtype_name__ = 'MiAZWatcher'
     __gsignals__ = {
         'repository-updated': (GObject.SignalFlags.RUN_LAST, None, ()),
+        'repository-changed': (GObject.SignalFlags.RUN_LAST, None, (object,)),
     }
 
-    def __init__(self, dirpath: str = None, remote=False):
+    def __init__(self, dirpath: str = None, remote=False, latency: float = 0):
         """
         Initialize MiAZWatcher and signal"
         """
         super().__init__()
         self.log = MiAZLog('MiAZ.Watcher')
-        self.dirpath = dirpath
+        self.dirpath = None
         self.remote = remote
-        self.before = {}
+        self.before = None
+        self.poll_min = POLL_MIN
+        self.poll_max = POLL_MAX
+        self.latency = latency      # Seconds added to every remote request
+        self._interval = POLL_MIN
+        self._dir_mtime = None
+        self._enumerated = 0        # Monotonic time of the last enumeration
+        self._cycle_start = 0
+        self._serial = 0            # Polling cycles of a previous path are ignored
+        self._stats = {'cycles': 0, 'skipped': 0, 'enumerated': 0, 'files': 0,
+                       'last': 0.0, 'total': 0.0, 'interval': POLL_MIN}
         self.active = False
         self.status = MiAZStatus.RUNNING
         self.updated = False
-        seconds = 2
-        self.log.debug(f"Watching repository: {dirpath}")
-        self.log.debug(f"Remote repository? {remote}")
-        self.log.debug(f"Timeout set to: {seconds}")
-        self.set_path(dirpath)
-        GLib.timeout_add_seconds(seconds, self.monitor, dirpath, self.watch)
+        self.changes = None         # Last batch of changes notified
+        self._monitor = None
+        self._monitor_sid = 0
+        self._poll_source = 0
+        self._debounce_source = 0
+        self._batch = MiAZChangeBatch()
+        self._batch_start = 0
+        self._batch_last = 0
+        self.set_path(dirpath, remote)
         self.log.debug("Watcher initialized")
 
     def files_with_timestamp_async(self, path, callback):
         """
-        Asynchronously fetches {file_path: mtime} from a directory.
-        'callback' is a function receiving the dictionary once ready.
+        Asynchronously fetches {name: (size, mtime, inode)} from a directory.
+        'callback' is a function receiving the dictionary once ready, or
+        None if the directory couldn't be read.
         """
-        if self.status == MiAZStatus.BUSY:
-            self.log.warning("Watcher is busy now. Trying later")
-            return
-        else:
-            # ~ self.log.info("Watcher is active")
-            pass
-
-        # ~ self.log.debug(f"Checking files for directory: {path}")
         gfile = Gio.File.new_for_path(path)
 
-        def on_query_info(fileobj, res, user_data):
-            try:
-                info = fileobj.query_info_finish(res)
-                if info.get_file_type() != Gio.FileType.DIRECTORY:
-                    self.log.warning(f"Not a directory: {path}")
-                    callback({})
-                    return
-
-                # Proceed with enumeration
-                fileobj.enumerate_children_async(
-                    'standard::name,standard::type,time::modified',
-                    Gio.FileQueryInfoFlags.NONE,
-                    GLib.PRIORITY_DEFAULT,
-                    None,
-                    on_enumerate_ready,
-                    None
-                )
-            except Exception as error:
-                self.log.error(f"Failed to query info: {error}")
-                callback({})
-
         def on_enumerate_ready(fileobj, res, user_data):
             timestamps = {}
             try:
@@ -100,41 +109,252 @@ class MiAZWatcher(GObject.GObject):
                         for i in infos:
                             if i.get_file_type() == Gio.FileType.REGULAR:
                                 name = i.get_name()
-                                mtime = i.get_modification_time().tv_sec
-                                child = fileobj.get_child(name)
-                                timestamps[child.get_uri()] = mtime
-                        enum.next_files_async(100, GLib.PRIORITY_DEFAULT, None, on_next_file, None)
+                                if name.startswith('.'):
+                                    continue
+                                mtime = i.get_attribute_uint64('time::modified') * 1000000000
+                                mtime += i.get_attribute_uint32('time::modified-usec') * 1000
+                                inode = i.get_attribute_uint64('unix::inode')
+                                timestamps[name] = (i.get_size(), mtime, inode)
+                        self._with_latency(enum.next_files_async, 100, GLib.PRIORITY_DEFAULT, None, on_next_file, None)
                     except Exception as error:
                         self.log.error(f"Error during file read: {error}")
-                        callback(timestamps)
+                        callback(None)
 
-                enumerator.next_files_async(100, GLib.PRIORITY_DEFAULT, None, on_next_file, None)
+                self._with_latency(enumerator.next_files_async, 100, GLib.PRIORITY_DEFAULT, None, on_next_file, None)
             except Exception as error:
                 self.log.error(f"Error during enumeration: {error}")
-                callback({})  # Return empty dict on failure
+                callback(None)
 
         # Set app as busy to block
         self.status = MiAZStatus.BUSY
 
-        # Query info first to ensure it's a directory
-        gfile.query_info_async(
-            'standard::*',
+        self._with_latency(gfile.enumerate_children_async,
+            'standard::name,standard::type,standard::size,time::modified,time::modified-usec,unix::inode',
             Gio.FileQueryInfoFlags.NONE,
-            GLib.PRIORITY_HIGH_IDLE,
+            GLib.PRIORITY_DEFAULT,
             None,
-            on_query_info,
+            on_enumerate_ready,
             None
         )
 
-    def set_path(self, dirpath: str):
+    def _with_latency(self, func, *args):
+        if self.latency > 0:
+            GLib.timeout_add(int(self.latency * 1000), lambda: func(*args) and False)
+        else:
+            func(*args)
+
+    def set_poll_interval(self, floor: float = POLL_MIN, ceiling: float = POLL_MAX):
+        """Set polling interval limits (seconds) for remote repositories"""
+        floor = max(0.1, float(floor))
+        self.poll_min = floor
+        self.poll_max = max(floor, float(ceiling))
+        self._interval = floor
+        self.log.debug(f"Polling interval between {self.poll_min} and {self.poll_max} seconds")
+
+    def set_latency(self, latency: float):
+        """Add latency (seconds) to every remote request. For testing."""
+        self.latency = max(0, latency)
+        if self.dirpath is not None:
+            self.set_path(self.dirpath)
+
+    def get_scan_stats(self) -> dict:
+        """
+        Return polling costs: number of cycles, cycles skipped thanks to
+        the directory mtime, cycles enumerated, files read in the last
+        enumeration, duration of the last cycle and of all of them
+        (seconds) and current interval.
+        """
+        return dict(self._stats)
+
+    def _schedule_poll(self):
+        self._stats['interval'] = self._interval
+        self._poll_source = GLib.timeout_add(int(self._interval * 1000), self._on_poll)
+
+    def _on_poll(self):
+        self._poll_source = 0
+        if not self.active or self.dirpath is None:
+            self._schedule_poll()
+            return False
+        self._cycle_start = GLib.get_monotonic_time()
+        gfile = Gio.File.new_for_path(self.dirpath)
+        self._with_latency(gfile.query_info_async,
+            'standard::type,time::modified,time::modified-usec',
+            Gio.FileQueryInfoFlags.NONE,
+            GLib.PRIORITY_DEFAULT,
+            None,
+            self._on_directory_info,
+            self._serial
+        )
+        return False
+
+    def _on_directory_info(self, gfile, res, serial):
+        if serial != self._serial:
+            # Path changed meanwhile. Another cycle is scheduled.
+            return
+        dirpath = self.dirpath
+        try:
+            info = gfile.query_info_finish(res)
+        except GLib.Error as error:
+            self.log.warning(f"Directory {dirpath} not available: {error.message}")
+            self._poll_done(changed=False)
+            return
+
+        if info.get_file_type() != Gio.FileType.DIRECTORY:
+            self.log.warning(f"Not a directory: {dirpath}")
+            self._poll_done(changed=False)
+            return
+
+        mtime = None
+        if info.has_attribute('time::modified'):
+            mtime = (info.get_attribute_uint64('time::modified'), info.get_attribute_uint32('time::modified-usec'))
+        overdue = self._cycle_start - self._enumerated >= self.poll_max * 1000000
+        if mtime is not None and mtime == self._dir_mtime and self.before is not None and not overdue:
+            self._poll_done(changed=False)
+            return
+
+        self._dir_mtime = mtime
+        self.files_with_timestamp_async(dirpath, lambda after: self._on_files(serial, after))
+
+    def _on_files(self, serial, after):
+        if serial != self._serial:
+            self.status = MiAZStatus.RUNNING
+            return
+        if after is None or not self.active:
+            # Read error or deactivated meanwhile. Nothing is assumed
+            # to be removed and the next cycle enumerates again.
+            self._dir_mtime = None
+            self.status = MiAZStatus.RUNNING
+            self._poll_done(changed=False)
+            return
+        self._enumerated = GLib.get_monotonic_time()
+        self.watch(after)
+        self._poll_done(changed=self.updated, files=len(after))
+
+    def _poll_done(self, changed: bool, files: int = None):
+        duration = (GLib.get_monotonic_time() - self._cycle_start) / 1000000
+        stats = self._stats
+        stats['cycles'] += 1
+        if files is None:
+            stats['skipped'] += 1
+        else:
+            stats['enumerated'] += 1
+            stats['files'] = files
+        stats['last'] = duration
+        stats['total'] += duration
+        if changed:
+            self._interval = self.poll_min
+        else:
+            self._interval = min(self._interval * 2, self.poll_max)
+        self._schedule_poll()
+
+    def set_path(self, dirpath: str, remote: bool = None):
         """Set a directory to watch"""
-        if dirpath is not None:
-            self.dirpath = dirpath
-            self.log.info(f"Watcher monitoring '{self.dirpath}'")
+        if dirpath is None:
+            return
+        if remote is not None:
+            self.remote = remote
+        self._stop()
+        self._serial += 1
+        self.dirpath = dirpath
+        self.before = None
+        self._dir_mtime = None
+        self._batch.clear()
+        self.log.info(f"Watcher monitoring '{self.dirpath}' (remote? {self.remote})")
+        # A local directory with injected latency stands in for a remote one
+        if not self.remote and self.latency == 0 and self._start_monitor():
+            return
+        self.log.debug(f"Polling every {self.poll_min} to {self.poll_max} seconds")
+        self._interval = self.poll_min
+        self._schedule_poll()
+
+    def _stop(self):
+        if self._monitor is not None:
+            self._monitor.disconnect(self._monitor_sid)
+            self._monitor.cancel()
+            self._monitor = None
+        if self._poll_source:
+            GLib.source_remove(self._poll_source)
+            self._poll_source = 0
+        if self._debounce_source:
+            GLib.source_remove(self._debounce_source)
+            self._debounce_source = 0
+
+    def _start_monitor(self) -> bool:
+        gfile = Gio.File.new_for_path(self.dirpath)
+        try:
+            monitor = gfile.monitor_directory(Gio.FileMonitorFlags.WATCH_MOVES, None)
+        except GLib.Error as error:
+            self.log.warning(f"File monitor not available ({error.message}). Fallback to polling")
+            return False
+        self._monitor = monitor
+        self._monitor_sid = monitor.connect('changed', self._on_monitor_changed)
+        self.log.debug("Using file monitor")
+        return True
+
+    def _on_monitor_changed(self, monitor, gfile, other, event):
+        name = gfile.get_basename()
+        other_name = other.get_basename() if other is not None else None
+        if event == Gio.FileMonitorEvent.RENAMED:
+            if name.startswith('.'):
+                if not other_name.startswith('.'):
+                    self._batch.add(other_name)
+            elif other_name.startswith('.'):
+                self._batch.remove(name)
+            else:
+                self._batch.rename(name, other_name)
+        elif name.startswith('.'):
+            # Hidden files and the repository config directory
+            return
+        elif event in (Gio.FileMonitorEvent.CREATED, Gio.FileMonitorEvent.MOVED_IN):
+            if gfile.query_file_type(Gio.FileQueryInfoFlags.NOFOLLOW_SYMLINKS, None) == Gio.FileType.DIRECTORY:
+                return
+            self._batch.add(name)
+        elif event in (Gio.FileMonitorEvent.DELETED, Gio.FileMonitorEvent.MOVED_OUT):
+            self._batch.remove(name)
+        elif event in (Gio.FileMonitorEvent.CHANGED,
+                       Gio.FileMonitorEvent.CHANGES_DONE_HINT,
+                       Gio.FileMonitorEvent.ATTRIBUTE_CHANGED):
+            self._batch.modify(name)
+        else:
+            return
+
+        now = GLib.get_monotonic_time()
+        self._batch_last = now
+        if not self._debounce_source:
+            self._batch_start = now
+            self._debounce_source = GLib.timeout_add(DEBOUNCE, self._on_debounce)
+
+    def _on_debounce(self):
+        now = GLib.get_monotonic_time()
+        quiet = now - self._batch_last >= DEBOUNCE * 1000
+        overdue = now - self._batch_start >= DEBOUNCE_MAX * 1000
+        if not (quiet or overdue):
+            return True
+        self._debounce_source = 0
+        self._flush()
+        return False
+
+    def _flush(self):
+        """Notify pending changes. They are kept while inactive."""
+        if not self.active or not self._batch:
+            return False
+        changes = self._batch.get_changes()
+        self._batch.clear()
+        self._notify(changes)
+        return False
+
+    def _notify(self, changes: MiAZChangeSet):
+        self.log.debug(f"Watcher > {changes}")
+        self.changes = changes
+        self.emit('repository-changed', changes)
+        self.emit('repository-updated')
 
     def set_active(self, active: bool = True) -> None:
         """Set current watcher as active"""
         self.active = active
+        if active and self._batch and not self._debounce_source:
+            # Deliver changes received while inactive
+            self._flush()
 
     def get_active(self):
         """Return if the watcher is active or not"""
@@ -148,13 +368,11 @@ class MiAZWatcher(GObject.GObject):
         been updated.
         """
         self.updated = False
-        if not self.active:
-            return False
-
-        if self.dirpath is None:
+        if not self.active or self.dirpath is None:
+            self.status = MiAZStatus.RUNNING
             return False
 
-        if not self.before:
+        if self.before is None:
             # First poll: establish baseline. All files look "added" because
             # before is empty, but they were already loaded by the workspace
             # on startup — emitting here would cause a redundant update.
@@ -162,35 +380,15 @@ class MiAZWatcher(GObject.GObject):
             self.status = MiAZStatus.RUNNING
             return True
 
-        added = [f for f in after.keys() if f not in self.before.keys()]
-        removed = [f for f in self.before.keys() if f not in after.keys()]
-        modified = []
-
-        for f in self.before.keys():
-            if f not in removed:
-                if after.get(f) != self.before.get(f):
-                    modified.append(f)
-
-        if added:
-            self.log.debug(f"Watcher > {len(added)} files added")
-            self.updated |= True
-        if removed:
-            self.log.debug(f"Watcher > {len(removed)} files removed")
-            self.updated |= True
-        if modified:
-            self.log.debug(f"Watcher > {len(modified)} files modified")
-            self.updated |= True
-
+        before = self.before
+        added = [name for name in after if name not in before]
+        removed = [name for name in before if name not in after]
+        modified = [name for name, stat in after.items() if name in before and before[name] != stat]
+        changes = MiAZChangeSet(added, removed, modified).detect_renames(before, after)
+        self.updated = bool(changes)
         if self.updated:
-            self.log.debug("Repository updated")
-            self.emit('repository-updated')
+            self._notify(changes)
 
         self.before = after
         self.status = MiAZStatus.RUNNING
         return True
-
-    def monitor(self, path, callback):
-        # ~ self.log.debug(f"Watcher active? {self.active}")
-        if self.active:
-            self.files_with_timestamp_async(path, callback)
-        return True
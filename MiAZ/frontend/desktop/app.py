@@ -24,8 +24,11 @@ from MiAZ.frontend.desktop.services.workflow import MiAZWorkflow
 from MiAZ.frontend.desktop.widgets.mainwindow import MiAZMainWindow
 
 from MiAZ.backend.util import MiAZUtil
+from MiAZ.backend.scanner import MiAZScanner
+from MiAZ.backend.index import MiAZDocumentIndex
 from MiAZ.backend.config import MiAZConfigApp
 from MiAZ.backend.repository import MiAZRepository
+from MiAZ.backend.stats import MiAZStats
 from MiAZ.backend.config import MiAZConfigRepositories
 from MiAZ.backend.status import MiAZStatus
 
@@ -51,6 +54,8 @@ class MiAZApp(Adw.Application):
         self._miazobjs['actions'] = {}
         self.log = MiAZLog("MiAZ.App")
         self.set_service('util', MiAZUtil(self))
+        self.set_service('scanner', MiAZScanner(self))
+        self.set_service('docindex', MiAZDocumentIndex(self))
         self.set_service('icons', MiAZIconManager(self))
         self.set_service('factory', MiAZFactory(self))
         self.set_service('actions', MiAZActions(self))
@@ -58,6 +63,7 @@ class MiAZApp(Adw.Application):
         workflow = self.set_service('workflow', MiAZWorkflow(self))
         repository = self.set_service('repo', MiAZRepository(self))
         repository.connect('repository-switched', workflow.switch_finish)
+        self.set_service('stats', MiAZStats(self))
         self._env = None
         self.conf = None
         self.app = None
@@ -15,6 +15,7 @@ from gi.repository import Adw
 from gi.repository import Gtk
 
 from MiAZ.backend.log import MiAZLog
+from MiAZ.backend.config import MiAZConfig
 from MiAZ.backend.models import Group, Country, Purpose, SentBy, SentTo, Date, Repository
 from MiAZ.frontend.desktop.widgets.configview import MiAZCountries, MiAZGroups, MiAZPurposes, MiAZPeopleSentBy, MiAZPeopleSentTo
 from MiAZ.frontend.desktop.widgets.configview import MiAZRepositories
@@ -197,6 +198,7 @@ class MiAZActions(GObject.GObject):
                 gfile = filechooser.get_file()
                 if gfile is not None:
                     target_directory = gfile.get_path()
+                    MiAZConfig.flush_all()
                     source_directory = pathlib.Path(os.path.join(repository.docs, '.conf'))
                     config_name_available = f"{name_available}-available.json"
                     config_name_used = f"{name_used}-used.json"
@@ -328,6 +330,7 @@ class MiAZActions(GObject.GObject):
         webserver = self.app.get_service('webserver')
         webserver.stop()
         self.app.emit("application-finished")
+        MiAZConfig.flush_all()
         self.app.quit()
 
     def stop_if_no_items(self, widget: Gtk.Widget = None):
@@ -350,5 +353,6 @@ class MiAZActions(GObject.GObject):
         python = sys.executable
         script = ENV['APP']['RUNTIME']['EXEC']
         self.app.emit('application-finished')
+        MiAZConfig.flush_all()
         self.log.info("Application restart: {python} {script} {sys.argv[1:]}")
         os.execv(python, [python, script] + sys.argv[1:])
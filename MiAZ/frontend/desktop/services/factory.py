@@ -330,15 +330,36 @@ class MiAZFactory:
             if ellipsize:
                 label.set_property('ellipsize', Pango.EllipsizeMode.MIDDLE)
             box.append(label)
+            counter = Gtk.Label(hexpand=True, xalign=1.0, visible=False)
+            counter.get_style_context().add_class(class_name='dim-label')
+            counter.get_style_context().add_class(class_name='caption')
+            box.append(counter)
             list_item.set_child(box)
 
         def _on_factory_bind(factory, list_item):
             box = list_item.get_child()
-            label = box.get_last_child()
+            label = box.get_first_child()
             item = list_item.get_item()
             label.set_markup(f'{item.title}')
             # ~ label.get_style_context().add_class(class_name='caption')
             # ~ label.get_style_context().add_class(class_name='monospace')
+            counter = box.get_last_child()
+            dropdown.counters[list_item] = counter
+            _set_counter(counter, item.id)
+
+        def _on_factory_unbind(factory, list_item):
+            dropdown.counters.pop(list_item, None)
+
+        def _set_counter(counter, key):
+            if dropdown.counts is None:
+                counter.set_visible(False)
+            else:
+                counter.set_text(str(dropdown.counts(key)))
+                counter.set_visible(True)
+
+        def _refresh_counters():
+            for list_item, counter in dropdown.counters.items():
+                _set_counter(counter, list_item.get_item().id)
 
         def _on_search_changed(search_entry, item_filter):
             item_filter.changed(Gtk.FilterChange.DIFFERENT)
@@ -356,6 +377,7 @@ class MiAZFactory:
         factory = Gtk.SignalListItemFactory()
         factory.connect("setup", _on_factory_setup, ellipsize)
         factory.connect("bind", _on_factory_bind)
+        factory.connect("unbind", _on_factory_unbind)
 
         # Create the model
         model = Gio.ListStore(item_type=item_type)
@@ -364,6 +386,11 @@ class MiAZFactory:
 
         # Create dropdown
         dropdown = Gtk.DropDown(model=filter_model, factory=factory, hexpand=True)
+
+        # Optional document counts (see dropdown_set_counts)
+        dropdown.counts = None
+        dropdown.counters = {}
+        dropdown.refresh_counters = _refresh_counters
         dropdown.set_show_arrow(True)
 
         # Enable search
@@ -396,6 +423,13 @@ class MiAZFactory:
 
         return dropdown
 
+    def dropdown_set_counts(self, dropdown, counts=None):
+        """Display next to every entry of a generic dropdown the number
+        of documents returned by counts(item id). None hides them.
+        Only bound rows are refreshed."""
+        dropdown.counts = counts
+        dropdown.refresh_counters()
+
     def create_dropdown(self, item_type):
         def _on_factory_setup(factory, list_item):
             box = Gtk.Box(spacing=6, orientation=Gtk.Orientation.HORIZONTAL)
@@ -4,14 +4,18 @@
 # License: GPL v3
 # Description: Icon manager
 
-import os
+from collections import OrderedDict
 
+from gi.repository import Gdk
 from gi.repository import Gtk
 from gi.repository import Gio
 from gi.repository import GObject
 
 from MiAZ.backend.log import MiAZLog
 
+# Icons kept by each cache (least recently used are dropped)
+ICON_CACHE_SIZE = 256
+
 
 class MiAZIconManager(GObject.GObject):
     """
@@ -32,6 +36,19 @@ class MiAZIconManager(GObject.GObject):
         super().__init__()
         self.app = app
         self.log = MiAZLog('MiAZ.IconManager')
+        self._mimetype_icons = OrderedDict()    # Extension -> Gio.Icon
+        self._flags = OrderedDict()             # (Country code, size, scale) -> Gtk.IconPaintable
+
+    def _cache_get(self, cache: OrderedDict, key):
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+    def _cache_set(self, cache: OrderedDict, key, value):
+        cache[key] = value
+        if len(cache) > ICON_CACHE_SIZE:
+            cache.popitem(last=False)
 
     def get_image_by_name(self, name: str, size: int = 24) -> Gtk.Image:
         """
@@ -52,16 +69,43 @@ class MiAZIconManager(GObject.GObject):
         """
         Get mimetype icon for a given file.
 
+        The icon is guessed from the file extension, without accessing
+        the file, and shared by all files with the same extension.
+
         :param filename: file name
         :type filename: str
         return: an icon
         rtype: Gio.ThemedIcon (GIcon)
         """
-        repository = self.app.get_service('repo')
-        basedir = repository.docs
-        filepath = os.path.join(basedir, filename)
-        if os.path.exists(filepath):
-            gfile = Gio.File.new_for_path(filepath)
-            info = gfile.query_info(Gio.FILE_ATTRIBUTE_STANDARD_ICON, Gio.FileQueryInfoFlags.NONE, None)
-            gicon = info.get_icon()
-            return gicon
\ No newline at end of file
+        dot = filename.rfind('.')
+        extension = filename[dot + 1:].lower() if dot > 0 else ''
+        gicon = self._cache_get(self._mimetype_icons, extension)
+        if gicon is None:
+            content_type, uncertain = Gio.content_type_guess(filename, None)
+            gicon = Gio.content_type_get_icon(content_type)
+            self._cache_set(self._mimetype_icons, extension, gicon)
+        return gicon
+
+    def get_flag_paintable(self, code: str, size: int = 24, scale: int = 1) -> Gdk.Paintable:
+        """
+        Get the flag of a country from the icon theme.
+
+        Unknown countries get the generic flag ('__').
+
+        :param code: country code
+        :type code: str
+        :param size: icon size
+        :type size: int
+        :param scale: scale factor of the widget showing it (HiDPI)
+        :type scale: int
+        return: a paintable
+        rtype: Gtk.IconPaintable
+        """
+        key = (code, size, scale)
+        paintable = self._cache_get(self._flags, key)
+        if paintable is None:
+            theme = Gtk.IconTheme.get_for_display(Gdk.Display.get_default())
+            name = code if theme.has_icon(code) else '__'
+            paintable = theme.lookup_icon(name, None, size, scale, Gtk.TextDirection.NONE, 0)
+            self._cache_set(self._flags, key, paintable)
+        return paintable
@@ -10,8 +10,9 @@ from gi.repository import GLib
 from gi.repository import GObject
 
 from MiAZ.backend.log import MiAZLog
+from MiAZ.backend.config import MiAZConfig
 from MiAZ.backend.status import MiAZStatus
-from MiAZ.backend.watcher import MiAZWatcher
+from MiAZ.backend.watcher import MiAZWatcher, POLL_MIN, POLL_MAX
 from MiAZ.frontend.desktop.widgets.settings import MiAZRepoSettings
 
 
@@ -44,6 +45,15 @@ class MiAZWorkflow(GObject.GObject):
         """Switch from one repository to another."""
         self.log.debug("Repository switch requested")
         repository = self.app.get_service('repo')
+
+        # Results of a running update belong to the previous repository
+        workspace = self.app.get_widget('workspace')
+        if workspace is not None:
+            workspace.cancel_update()
+
+        # Config of the previous repository must be on disk
+        MiAZConfig.flush_all()
+
         repository.reset()
         try:
             self.app.set_status(MiAZStatus.BUSY)
@@ -132,9 +142,18 @@ class MiAZWorkflow(GObject.GObject):
             self.log.info(f"Remote directory '{repository.docs}' is NOT available. Reason: {error}")
             return
 
-        watcher = MiAZWatcher(dirpath=repository.docs, remote=remote)
+        # One watcher for the whole session. Listeners stay connected.
+        # Polling limits (remote repositories) and latency (testing) can
+        # be tuned in the app config.
+        appconf = self.app.get_config('App')
+        watcher = self.app.get_service('watcher')
+        if watcher is None:
+            watcher = self.app.set_service('watcher', MiAZWatcher(remote=remote))
+        watcher.set_poll_interval(appconf.get('watcher_poll_min') or POLL_MIN,
+                                  appconf.get('watcher_poll_max') or POLL_MAX)
+        watcher.latency = float(appconf.get('watcher_latency') or 0)
+        watcher.set_path(repository.docs, remote)
         watcher.set_active(active=True)
-        self.app.set_service('watcher', watcher)
         self.log.debug("Repository switch finished")
 
         # Setup stack pages
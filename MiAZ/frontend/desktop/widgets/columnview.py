@@ -61,16 +61,66 @@ class ColCheck(Gtk.Box):
         check = Gtk.CheckButton()
         self.append(check)
 
+class MiAZSelectedItems:
+    """
+    Selected items of a Gtk.SelectionModel, read on demand.
+
+    A read-only sequence over the selection bitset: len() is the size
+    of the bitset and items are fetched from the model only when they
+    are iterated or indexed. The bitset is copied when the proxy is
+    created and every item read is kept, so reading it again returns
+    the same items. Positions not read yet are looked up in the model
+    as it is then: take list(selected) to keep the items before the
+    view can change (eg.: while a dialog is open).
+    """
+    __slots__ = ('_model', '_bitset', '_items')
+
+    def __init__(self, selection=None):
+        self._model = None
+        self._bitset = None
+        self._items = {}        # Index in the selection -> item
+        if selection is not None:
+            self._model = selection.get_model()
+            self._bitset = selection.get_selection()
+
+    def __len__(self):
+        if self._bitset is None:
+            return 0
+        return self._bitset.get_size()
+
+    def _get(self, index: int):
+        try:
+            return self._items[index]
+        except KeyError:
+            item = self._model.get_item(self._bitset.get_nth(index))
+            self._items[index] = item
+            return item
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self._get(index)
+
+    def __getitem__(self, index):
+        size = len(self)
+        if isinstance(index, slice):
+            return [self._get(pos) for pos in range(size)[index]]
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError('selected item index out of range')
+        return self._get(index)
+
+
 class MiAZColumnView(Gtk.Box):
     """ Custom ColumnView widget for MiAZ """
     __gtype_name__ = 'MiAZColumnView'
 
-    def __init__(self, app, item_type=MiAZItem):
+    def __init__(self, app, item_type=MiAZItem, store=None):
         super().__init__(orientation=Gtk.Orientation.VERTICAL, spacing=3, hexpand=True, vexpand=True)
         self.app = app
         self.item_type = item_type
         self.log = MiAZLog('MiAZColumnView')
-        self.selected_items = []
+        self.selected_items = MiAZSelectedItems()
 
         self.viewport = Gtk.Viewport()
         self.scrwin = Gtk.ScrolledWindow()
@@ -106,7 +156,11 @@ class MiAZColumnView(Gtk.Box):
 
         # Setup models
         cv_sorter = self.cv.get_sorter()
-        self.store = Gio.ListStore(item_type=item_type)
+        # Other stores need a Gio.ListStore like splice(), or update()
+        # overridden (see MiAZColumnViewWorkspace)
+        if store is None:
+            store = Gio.ListStore(item_type=item_type)
+        self.store = store
         self.sort_model  = Gtk.SortListModel(model=self.store, sorter=cv_sorter)
         self.filter_model = Gtk.FilterListModel(model=self.sort_model)
         self.selection = Gtk.MultiSelection.new(self.filter_model)
@@ -117,6 +171,8 @@ class MiAZColumnView(Gtk.Box):
         # Connect signals
         self.cv.connect("activate", self._on_selected_item_notify)
         self.selection.connect('selection-changed', self._on_selection_changed)
+        # Selected positions move when the view is sorted or filtered
+        self.selection.connect('items-changed', self._on_selection_changed)
 
     def get_columnview(self):
         return self.cv
@@ -161,21 +217,18 @@ class MiAZColumnView(Gtk.Box):
         self.filter_model.set_filter(self.filter)
         return self.filter
 
-    def refilter(self):
-        self.filter.emit('changed', Gtk.FilterChange.DIFFERENT)
+    def refilter(self, change=Gtk.FilterChange.DIFFERENT):
+        """Re-evaluate the filter. With MORE_STRICT (or LESS_STRICT)
+        only visible (or hidden) items are checked again."""
+        self.filter.emit('changed', change)
 
     def update(self, items):
-        self.selected_items = []
+        self.selected_items = MiAZSelectedItems()
         self.store.splice(0, self.store.get_n_items(), items)
 
-    def _on_selection_changed(self, selection, position, n_items):
-        self.selected_items = []
-        model = selection.get_model()
-        bitset = selection.get_selection()
-        for index in range(bitset.get_size()):
-            pos = bitset.get_nth(index)
-            item = model.get_item(pos)
-            self.selected_items.append(item)
+    def _on_selection_changed(self, selection, *args):
+        # Items are only fetched when read (see MiAZSelectedItems)
+        self.selected_items = MiAZSelectedItems(selection)
 
     def _on_factory_setup_id(self, factory, list_item):
         box = ColLabel()
@@ -229,7 +282,7 @@ class MiAZColumnViewSelector(Gtk.Box):
         self.log = MiAZLog('MiAZColumnViewSelector')
         self.factory = self.app.get_service('factory')
         self.actions = self.app.get_service('actions')
-        self.selected_items = []
+        self.selected_items = MiAZSelectedItems()
 
         self.viewport = Gtk.Viewport()
         self.scrwin = Gtk.ScrolledWindow()
@@ -328,21 +381,18 @@ class MiAZColumnViewSelector(Gtk.Box):
         self.filter_model.set_filter(self.filter)
         return self.filter
 
-    def refilter(self):
-        self.filter.emit('changed', Gtk.FilterChange.DIFFERENT)
+    def refilter(self, change=Gtk.FilterChange.DIFFERENT):
+        """Re-evaluate the filter. With MORE_STRICT (or LESS_STRICT)
+        only visible (or hidden) items are checked again."""
+        self.filter.emit('changed', change)
 
     def update(self, items):
-        self.selected_items = []
+        self.selected_items = MiAZSelectedItems()
         self.store.splice(0, self.store.get_n_items(), items)
 
-    def _on_selection_changed(self, selection, position, n_items):
-        self.selected_items = []
-        model = selection.get_model()
-        bitset = selection.get_selection()
-        for index in range(bitset.get_size()):
-            pos = bitset.get_nth(index)
-            item = model.get_item(pos)
-            self.selected_items.append(item)
+    def _on_selection_changed(self, selection, *args):
+        # Items are only fetched when read (see MiAZSelectedItems)
+        self.selected_items = MiAZSelectedItems(selection)
 
     def _on_factory_setup_id(self, factory, list_item):
         box = ColLabel()
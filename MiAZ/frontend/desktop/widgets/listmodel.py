@@ -0,0 +1,191 @@
+#!/usr/bin/python3
+# File: listmodel.py
+# Author: Tomás Vírseda
+# License: GPL v3
+# Description: Lazy list model of workspace documents
+
+import weakref
+from collections import OrderedDict
+from itertools import compress, count
+from operator import is_, is_not, not_
+
+from gi.repository import Gio
+from gi.repository import GLib
+from gi.repository import GObject
+from gi.repository import Gtk
+
+from MiAZ.backend.columns import MiAZColumns, RESORT_RATIO, DIFF_MAX_RUNS
+from MiAZ.backend.columns import diff_rows, row_id
+from MiAZ.backend.models import MiAZItem
+
+# Items kept alive after GTK releases them (eg.: while scrolling)
+ITEM_POOL_SIZE = 512
+
+
+def collate_key(value: str) -> str:
+    """Locale collation key, as Gtk.Collation.UNICODE sorters use"""
+    return GLib.utf8_collate_key(value, -1)
+
+
+class MiAZColumnStore(GObject.Object, Gio.ListModel):
+    """
+    Gio.ListModel of MiAZItem objects built on demand.
+
+    Documents are given as rows (MiAZRow). The store filters and sorts
+    them itself, over row positions and key columns (see MiAZColumns),
+    so no GTK filter or sorter has to visit every item. A MiAZItem is
+    only created when GTK requests a position, which is usually a row
+    on screen. Items still referenced elsewhere (bound rows, selections)
+    are found again through a weak cache, and the most recently
+    requested ones are kept in a small pool.
+
+    Rows are matched by document name and identity: set_rows() only
+    filters the rows that are new or changed and inserts them in sort
+    order. Changes are notified as the runs of positions removed and
+    inserted, so GTK keeps the rest of the rows bound and selected.
+    When rows move (eg.: a new sort order) the range between the first
+    and the last change is replaced instead.
+    """
+    __gtype_name__ = 'MiAZColumnStore'
+
+    def __init__(self, item_type=MiAZItem):
+        super().__init__()
+        self.item_type = item_type
+        self.data = MiAZColumns(collate_key)
+        self._docs = {}         # Name -> row, as given to set_rows()
+        self._shown = []        # Rows displayed, in order
+        self._filter = None     # Callable (row, None) -> bool
+        self._sort = []         # [(key field, descending, collated), ...]
+        self._items = weakref.WeakValueDictionary()     # Row -> item
+        self._pool = OrderedDict()                      # Row -> item
+
+    def do_get_item_type(self):
+        return self.item_type.__gtype__
+
+    def do_get_n_items(self):
+        return len(self._shown)
+
+    def do_get_item(self, position):
+        if position >= len(self._shown):
+            return None
+        row = self._shown[position]
+        item = self._items.get(row)
+        if item is None:
+            item = self.item_type.from_row(row)
+            self._items[row] = item
+        pool = self._pool
+        pool[row] = item
+        pool.move_to_end(row)
+        if len(pool) > ITEM_POOL_SIZE:
+            pool.popitem(last=False)
+        return item
+
+    def set_rows(self, docs: dict) -> bool:
+        """Replace the documents, given as a dictionary (name -> row)
+        that is not modified afterwards. Return False if nothing
+        changed."""
+        old = self._docs
+        rows = list(docs.values())
+        fresh = list(compress(rows, map(is_not, map(old.get, docs), rows)))
+        gone = len(old) - (len(rows) - len(fresh))
+        if not fresh and not gone:
+            return False
+        self._docs = docs
+        self.data.set_rows(rows)
+        for row in [row for row in self._pool if docs.get(row.id) is not row]:
+            del self._pool[row]
+        if len(fresh) + gone > len(rows) // RESORT_RATIO:
+            self.refilter()
+            return True
+
+        # Only new and changed rows are filtered and sorted
+        accept = self._filter
+        if accept is not None:
+            fresh = [row for row in fresh if accept(row, None)]
+        shown = self._shown
+        kept = list(map(is_, map(docs.get, map(row_id, shown)), shown))
+        stale = list(compress(count(), map(not_, kept)))
+        if len(stale) + len(fresh) > DIFF_MAX_RUNS:
+            self._show(self.data.insert(list(compress(shown, kept)), fresh, self._sort))
+            return True
+
+        # Removed and inserted one by one, so other rows keep their place
+        for pos in reversed(stale):
+            del shown[pos]
+            self.items_changed(pos, 1, 0)
+        self.data.insert(shown, fresh, self._sort, lambda pos: self.items_changed(pos, 0, 1))
+        return True
+
+    def set_filter(self, filter_func):
+        """filter_func(row, None) tells whether a row is displayed"""
+        self._filter = filter_func
+
+    def set_sort(self, sort: list) -> bool:
+        """Sort by [(key field, descending, collated), ...]. The first
+        key is the primary one and the rest break ties, in order.
+        Collated keys are compared with the locale rules."""
+        self._sort = list(sort)
+        self._show(self.data.sorted_rows(self.data.positions(self._shown), self._sort), moved=True)
+        return True
+
+    def refilter(self, change=Gtk.FilterChange.DIFFERENT) -> bool:
+        """Evaluate the filter again. With MORE_STRICT only displayed
+        rows are checked, with LESS_STRICT only hidden ones."""
+        rows = self.data.rows
+        accept = self._filter
+        if accept is None:
+            visible = list(range(len(rows)))
+        elif change == Gtk.FilterChange.MORE_STRICT:
+            # Displayed rows are already sorted
+            self._show([row for row in self._shown if accept(row, None)])
+            return True
+        elif change == Gtk.FilterChange.LESS_STRICT:
+            shown = set(map(row_id, self._shown))
+            visible = [pos for pos, row in enumerate(rows) if row.id in shown or accept(row, None)]
+        else:
+            visible = [pos for pos, row in enumerate(rows) if accept(row, None)]
+        self._show(self.data.sorted_rows(visible, self._sort))
+        return True
+
+    def _show(self, shown: list, moved: bool = False):
+        """Display the given rows, taken from the same documents,
+        notifying only what changed. moved tells rows changed order."""
+        old = self._shown
+        n_old = len(old)
+        n_new = len(shown)
+
+        # Common head and tail are left alone
+        limit = min(n_old, n_new)
+        start = next(compress(count(), map(is_not, old, shown)), limit)
+        tail = next(compress(count(), map(is_not, reversed(old), reversed(shown))), limit)
+        tail = min(tail, limit - start)
+        end_old = n_old - tail
+        end_new = n_new - tail
+        if start == end_old and start == end_new:
+            self._shown = shown
+            return
+
+        runs = None
+        if not moved:
+            runs = diff_rows(old[start:end_old], shown[start:end_new], DIFF_MAX_RUNS)
+        if runs is None:
+            self._shown = shown
+            self.items_changed(start, end_old - start, end_new - start)
+            return
+
+        # GTK reads the model after every run: it must be in between
+        for pos, removed, rows in runs:
+            pos += start
+            old[pos:pos + removed] = rows
+            self.items_changed(pos, removed, len(rows))
+        self._shown = shown
+
+    def get_ids(self, positions) -> list:
+        """Document names displayed at the given positions"""
+        shown = self._shown
+        return [shown[pos].id for pos in positions]
+
+    def find(self, names) -> list:
+        """Positions where the given documents are displayed"""
+        names = set(names)
+        return [pos for pos, row in enumerate(self._shown) if row.id in names]
@@ -4,7 +4,6 @@
 # License: GPL v3
 # Description: Different views based on ColumnView widget
 
-import os
 from gettext import gettext as _
 
 from gi.repository import Gtk
@@ -14,6 +13,7 @@ from MiAZ.backend.log import MiAZLog
 from MiAZ.frontend.desktop.widgets.columnview import MiAZColumnView
 from MiAZ.frontend.desktop.widgets.columnview import MiAZColumnViewSelector
 from MiAZ.frontend.desktop.widgets.columnview import ColIcon, ColLabel, ColCheck
+from MiAZ.frontend.desktop.widgets.listmodel import MiAZColumnStore
 from MiAZ.backend.models import MiAZItem, Country, Group, Person, Purpose, File, Repository, Plugin, Concept
 
 
@@ -22,7 +22,9 @@ class MiAZColumnViewWorkspace(MiAZColumnView):
     __gtype_name__ = 'MiAZColumnViewWorkspace'
 
     def __init__(self, app):
-        super().__init__(app, item_type=MiAZItem)
+        # Documents are given as rows (MiAZRow). The store filters and
+        # sorts them, and items are only built for requested positions.
+        super().__init__(app, item_type=MiAZItem, store=MiAZColumnStore(MiAZItem))
         self.log = MiAZLog('MiAZColumnViewWorkspace')
         self.srvicm = self.app.get_service('icons')
         self.factory_subtitle = Gtk.SignalListItemFactory()
@@ -93,15 +95,23 @@ class MiAZColumnViewWorkspace(MiAZColumnView):
         self.column_extension.set_expand(False)
 
         # Sorting
-        self.prop_group_sorter = Gtk.CustomSorter.new(sort_func=self._on_sort_string_func, user_data='group')
-        self.prop_purpose_sorter = Gtk.CustomSorter.new(sort_func=self._on_sort_string_func, user_data='purpose')
-        self.prop_sentby_sorter = Gtk.CustomSorter.new(sort_func=self._on_sort_string_func, user_data='sentby_dsc')
-        self.prop_concept_sorter = Gtk.CustomSorter.new(sort_func=self._on_sort_string_func, user_data='subtitle')
-        self.prop_sentto_sorter = Gtk.CustomSorter.new(sort_func=self._on_sort_string_func, user_data='sentto_dsc')
-        self.prop_date_sorter = Gtk.CustomSorter.new(sort_func=self._on_sort_string_func, user_data='date')
-        self.prop_flag_sorter = Gtk.CustomSorter.new(sort_func=self._on_sort_string_func, user_data='country')
-        self.prop_country_sorter = Gtk.CustomSorter.new(sort_func=self._on_sort_string_func, user_data='country')
-        self.prop_extension_sorter = Gtk.CustomSorter.new(sort_func=self._on_sort_string_func, user_data='extension')
+        # Column sorters make headers clickable and keep the sort order
+        # chosen by the user. Documents are sorted by the store, over
+        # the same keys precomputed by MiAZRow (see MiAZColumnStore): a
+        # Gtk.SortListModel would create every MiAZItem to sort them.
+        # Descriptions use locale collation, codes a plain comparison.
+        # Timings: scripts/devel/benchmark_workspace_sort.py
+        self.prop_group_sorter = self._new_string_sorter('sort-group')
+        self.prop_purpose_sorter = self._new_string_sorter('sort-purpose')
+        self.prop_sentby_sorter = self._new_string_sorter('sort-sentby', Gtk.Collation.UNICODE)
+        self.prop_concept_sorter = self._new_string_sorter('sort-concept', Gtk.Collation.UNICODE)
+        self.prop_sentto_sorter = self._new_string_sorter('sort-sentto', Gtk.Collation.UNICODE)
+        self.prop_date_sorter = Gtk.NumericSorter.new(Gtk.PropertyExpression.new(MiAZItem, None, 'sort-date'))
+        self.prop_flag_sorter = self._new_string_sorter('sort-country')
+        self.prop_country_sorter = self._new_string_sorter('sort-country')
+        self.prop_extension_sorter = self._new_string_sorter('sort-extension')
+        self.prop_title_sorter = self._new_string_sorter('sort-title')
+        self.column_title.set_sorter(self.prop_title_sorter)
         self.column_group.set_sorter(self.prop_group_sorter)
         self.column_purpose.set_sorter(self.prop_purpose_sorter)
         self.column_sentby.set_sorter(self.prop_sentby_sorter)
@@ -112,8 +122,94 @@ class MiAZColumnViewWorkspace(MiAZColumnView):
         self.column_country.set_sorter(self.prop_country_sorter)
         self.column_extension.set_sorter(self.prop_extension_sorter)
 
-        # Default sorting by date
-        self.cv.sort_by_column(self.column_date, Gtk.SortType.DESCENDING)
+        # Column -> (MiAZRow sort key, collated)
+        self._sort_keys = {
+            self.column_date: ('sort_date', False),
+            self.column_country: ('sort_country', False),
+            self.column_flag: ('sort_country', False),
+            self.column_group: ('sort_group', False),
+            self.column_purpose: ('sort_purpose', False),
+            self.column_title: ('sort_title', False),
+            self.column_subtitle: ('sort_concept', True),
+            self.column_sentby: ('sort_sentby', True),
+            self.column_sentto: ('sort_sentto', True),
+            self.column_extension: ('sort_extension', False),
+        }
+
+        # GTK models on top of the store pass items through
+        self.sort_model.set_sorter(None)
+        self.cv.get_sorter().connect('changed', self._on_sorter_changed)
+
+        # Default sorting by date, then by sender
+        self.set_sort_columns([(self.column_date, Gtk.SortType.DESCENDING),
+                               (self.column_sentby, Gtk.SortType.ASCENDING)])
+
+    def _new_string_sorter(self, prop: str, collation=Gtk.Collation.NONE):
+        expression = Gtk.PropertyExpression.new(MiAZItem, None, prop)
+        sorter = Gtk.StringSorter.new(expression)
+        sorter.set_ignore_case(False)
+        sorter.set_collation(collation)
+        return sorter
+
+    def set_sort_columns(self, columns: list):
+        """Sort by several columns: [(column, Gtk.SortType), ...].
+
+        The first column is the primary sort key and the rest break
+        ties, in order.
+        """
+        for column, order in reversed(columns):
+            self.cv.sort_by_column(column, order)
+
+    def _on_sorter_changed(self, sorter, change):
+        sort = []
+        for index in range(sorter.get_n_sort_columns()):
+            column, order = sorter.get_nth_sort_column(index)
+            key = self._sort_keys.get(column)
+            if key is not None:
+                field, collated = key
+                sort.append((field, order == Gtk.SortType.DESCENDING, collated))
+        self._keep_view(self.store.set_sort, sort)
+
+    def set_filter(self, filter_func):
+        """filter_func(row, None) is called for every document (MiAZRow)
+        by the store. No GTK filter is involved."""
+        self.filter = filter_func
+        self.store.set_filter(filter_func)
+        return filter_func
+
+    def refilter(self, change=Gtk.FilterChange.DIFFERENT):
+        """Re-evaluate the filter. With MORE_STRICT (or LESS_STRICT)
+        only visible (or hidden) documents are checked again."""
+        self._keep_view(self.store.refilter, change)
+
+    def update(self, docs: dict):
+        """Replace the documents displayed (name -> MiAZRow).
+
+        Rows are matched by name and identity, so the caller must reuse
+        rows of unchanged documents. Only changed rows are notified, and
+        selection and scroll position are kept.
+        """
+        self._keep_view(self.store.set_rows, docs)
+
+    def _keep_view(self, change, *args):
+        """Apply a change to the store, then select again the documents
+        whose rows were replaced and restore the scroll position"""
+        vadjustment = self.scrwin.get_vadjustment()
+        scroll = vadjustment.get_value()
+        bitset = self.selection.get_selection()
+        selected = self.store.get_ids(bitset.get_nth(index) for index in range(bitset.get_size()))
+        if not change(*args):
+            return
+        if selected:
+            positions = self.store.find(selected)
+            # Rows kept by the store keep their selection
+            if positions and len(positions) != self.selection.get_selection().get_size():
+                bitset = Gtk.Bitset.new_empty()
+                for pos in positions:
+                    bitset.add(pos)
+                mask = Gtk.Bitset.new_range(0, self.store.get_n_items())
+                self.selection.set_selection(bitset, mask)
+        vadjustment.set_value(scroll)
 
     def _on_factory_setup_subtitle(self, factory, list_item):
         box = ColLabel()
@@ -280,8 +376,7 @@ class MiAZColumnViewWorkspace(MiAZColumnView):
         box.set_halign(Gtk.Align.CENTER)
         item = list_item.get_item()
         icon = box.get_first_child()
-        code = item.country
-        icon.set_from_icon_name(code)
+        icon.set_from_paintable(self.srvicm.get_flag_paintable(item.country, 24, icon.get_scale_factor()))
         icon.set_pixel_size(24)
         tooltip = f"<big>{item.country}</big>\n<b>{item.country_dsc}</b>"
         icon.set_tooltip_markup(tooltip)
@@ -313,14 +408,11 @@ class MiAZColumnViewCountry(MiAZColumnViewSelector):
         list_item.set_child(box)
 
     def _on_factory_bind_flag(self, factory, list_item):
-        ENV = self.app.get_env()
+        srvicm = self.app.get_service('icons')
         box = list_item.get_child()
         country = list_item.get_item()
         icon = box.get_first_child()
-        flag = os.path.join(ENV['GPATH']['FLAGS'], f"{country.id}.svg")
-        if not os.path.exists(flag):
-            flag = os.path.join(ENV['GPATH']['FLAGS'], "__.svg")
-        icon.set_from_file(flag)
+        icon.set_from_paintable(srvicm.get_flag_paintable(country.id, 36, icon.get_scale_factor()))
         icon.set_pixel_size(36)
         tooltip = f"<big>{country.id}</big>\n<b>{country.title}</b>"
         icon.set_tooltip_markup(tooltip)
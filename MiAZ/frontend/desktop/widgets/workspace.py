@@ -5,6 +5,7 @@
 # Description: The central place to manage the AZ
 
 import os
+import threading
 from datetime import datetime, timedelta
 from gettext import gettext as _
 
@@ -14,9 +15,16 @@ from gi.repository import GObject
 
 from MiAZ.env import ENV
 from MiAZ.backend.log import MiAZLog
-from MiAZ.backend.models import MiAZItem, Group, Country, Purpose, SentBy, SentTo, Date
+from MiAZ.backend.bitmap import MiAZBitmapIndex
+from MiAZ.backend.index import MiAZDocumentIndex
+from MiAZ.backend.facets import MiAZFacets, FACET_FIELDS
+from MiAZ.backend.filters import MiAZFilterChain
+from MiAZ.backend.search import MiAZSearchIndex, narrows
+from MiAZ.backend.pipeline import MiAZPipeline, get_config_snapshot, get_config_version
+from MiAZ.backend.models import Group, Country, Purpose, SentBy, SentTo, Date
 from MiAZ.frontend.desktop.widgets.assistant import MiAZAssistantRepoSettings
 from MiAZ.frontend.desktop.widgets.views import MiAZColumnViewWorkspace
+from MiAZ.frontend.desktop.widgets.columnview import MiAZSelectedItems
 from MiAZ.frontend.desktop.widgets.configview import MiAZCountries, MiAZGroups, MiAZPurposes, MiAZPeopleSentBy, MiAZPeopleSentTo
 from MiAZ.backend.status import MiAZStatus
 
@@ -28,6 +36,9 @@ Field[SentBy] = 3
 Field[Purpose] = 4
 Field[SentTo] = 6
 
+# Milliseconds without typing before the search text is applied
+SEARCH_DELAY = 250
+
 Configview = {}
 Configview['Country'] = MiAZCountries
 Configview['Group'] = MiAZGroups
@@ -51,7 +62,7 @@ class MiAZWorkspace(Gtk.Box):
     _num_displayed_items = 0
     _num_total_items = 0
     workspace_loaded = False
-    selected_items = []
+    selected_items = MiAZSelectedItems()
     dates = {}
     cache = {}
     uncategorized = False
@@ -75,11 +86,32 @@ class MiAZWorkspace(Gtk.Box):
         self._cached_search_text = ''
         self._cached_date_ll = 'All'
         self._cached_date_ul = 'All'
-        self._cached_date_start = None
-        self._cached_date_end = None
+        self._cached_base = 0                   # Documents passing all filters but field dropdowns
+        self._cached_visible = frozenset().__contains__   # Name -> passes all bitmap filters
+        self._bitmap_filters = {}               # Name -> callback(MiAZBitmapIndex) returning a bitset
+        self._docs = {}             # Document name -> MiAZRow
+        self._scan_dirpath = None
+        self._scan_generation = 0
+        self._config_version = None     # Config versions of the current classification
+        self._update_generation = 0     # Results of older updates are discarded
+        self._update_cancellable = None
+        self._update_applying = False
+        self._update_pending = False
+        self._search = MiAZSearchIndex()
+        self._bitmap = MiAZBitmapIndex()
+        self._filter_chain = MiAZFilterChain()
+        self._filter_state = None       # Filter state of the last refilter
+        self._search_source = None
+        self._facets = MiAZFacets()
+        self._facets_key = None
+        self._facets_source = None
 
         # Allow plug-ins to make their job
-        self.connect('workspace-view-updated', self._on_filter_selected)
+        self.connect('workspace-view-updated', self._on_view_updated)
+
+        # Document counts in sidebar dropdowns
+        self.connect('workspace-view-updated', self._schedule_facets)
+        self.connect('workspace-view-filtered', self._schedule_facets)
         self.app.connect('application-started', self._on_finish_configuration)
         self.app.connect('application-finished', self._on_application_finished)
 
@@ -99,6 +131,7 @@ class MiAZWorkspace(Gtk.Box):
         self.cache = {}
         for cache in ['Date', 'Country', 'Group', 'SentBy', 'SentTo', 'Purpose']:
             self.cache[cache] = {}
+        self._config_version = None
         self.log.debug("Caches initialized")
 
     def _check_first_time(self):
@@ -180,7 +213,7 @@ class MiAZWorkspace(Gtk.Box):
         self.emit('workspace-loaded')
 
     def _on_repo_switch(self, *args):
-        self.selected_items = []
+        self.selected_items = MiAZSelectedItems()
         self.update()
         for node in self.config:
             if node in self._repo_switch_signals:
@@ -211,7 +244,7 @@ class MiAZWorkspace(Gtk.Box):
         return self.workspace_loaded
 
     def unselect_items(self):
-        self.selected_items = []
+        self.selected_items = MiAZSelectedItems()
 
     def update_dropdown_filter(self, config, item_type):
         actions = self.app.get_service('actions')
@@ -321,10 +354,22 @@ class MiAZWorkspace(Gtk.Box):
 
         return frame
 
-    def register_filter_view(self, name: str, callback):
+    def register_filter_view(self, name: str, callback, bitmap: bool = False):
+        """Register a workspace filter.
+
+        By default, callback(item, filter_list_model) is called for
+        every document. item is the document row (MiAZRow, with the
+        same property names as MiAZItem) and filter_list_model is None.
+        With bitmap=True, callback(MiAZBitmapIndex) is called once per
+        filter pass and returns the bitset of accepted documents (see
+        MiAZBitmapIndex.bitset), or None to accept all.
+        """
         registered = False
-        if name not in self._workspace_filters:
-            self._workspace_filters[name] = callback
+        if name not in self._workspace_filters and name not in self._bitmap_filters:
+            if bitmap:
+                self._bitmap_filters[name] = callback
+            else:
+                self._workspace_filters[name] = callback
             self.log.debug(f"Added new workspace filter: {name}")
             registered = True
         else:
@@ -336,6 +381,9 @@ class MiAZWorkspace(Gtk.Box):
         if name in self._workspace_filters:
             del(self._workspace_filters[name])
             unregistered = True
+        elif name in self._bitmap_filters:
+            del(self._bitmap_filters[name])
+            unregistered = True
         else:
             self.log.error(f"Workspace filter {name} was not registered. Skip.")
         return unregistered
@@ -378,6 +426,8 @@ class MiAZWorkspace(Gtk.Box):
         return self.view
 
     def get_selected_items(self):
+        """Selected documents (MiAZSelectedItems). Items are fetched
+        as they are read, so take list() of it to keep them."""
         return self.selected_items
 
     def clear_filters(self):
@@ -396,145 +446,189 @@ class MiAZWorkspace(Gtk.Box):
         finally:
             self._clearing_filters = False
 
+        self._cancel_search_delay()
         self._refresh_filter_cache()
+        self._filter_state = self._get_filter_state()
         self.view.refilter()
         self.emit('workspace-view-filtered')
 
     def update(self, *args):
-        """Update Workspace columnview"""
+        """Update Workspace columnview.
+
+        Scanning and classification run in a worker thread. Results are
+        applied later from the main loop (see _update_finish). A newer
+        request cancels the running one.
+        """
         if self._clearing_filters:
             return
 
-        #Load necessary services
-        util = self.app.get_service('util')
-
         # No update while app is busy (expected during startup/plugin loading)
         if self.app.get_status() == MiAZStatus.BUSY:
             if self.app.get_plugins_loaded():
                 self.log.warning("App is busy. Workspace not updated")
             return
 
-        self.app.set_status(MiAZStatus.BUSY)
+        # Applying results (eg.: renaming invalid documents) triggers
+        # new requests. Run them once, when done.
+        if self._update_applying:
+            self._update_pending = True
+            return
 
         # No update is no repository is loaded
         repository = self.app.get_service('repo')
         if repository.conf is None:
             return
 
-        ds = datetime.now() # Measure performance (start timestamp)
+        self.cancel_update()
+        cancellable = threading.Event()
+        self._update_cancellable = cancellable
+
+        # Everything the worker needs is taken now from the main thread
+        # Descriptions and 'active' flags depend on the config
+        config = get_config_snapshot(self.app)
+        config_version = get_config_version(config)
+        full = config_version != self._config_version or repository.docs != self._scan_dirpath
+        task = {
+            'generation': self._update_generation,
+            'dirpath': repository.docs,
+            'full': full,
+            'scan_generation': self._scan_generation,
+            'config': config,
+            'config_version': config_version,
+            'docs': {} if full else dict(self._docs),
+            'previous': self._docs,     # Never modified in place
+            'bitmap': self._bitmap,     # Never modified in place either
+            'search': self._search,     # Same
+            'dates': dict(self.cache['Date']),  # Merged back when finished
+            'start': datetime.now(),  # Measure performance (start timestamp)
+        }
+        worker = threading.Thread(target=self._update_worker, args=(task, cancellable), daemon=True)
+        worker.start()
+        return False
+
+    def cancel_update(self):
+        """Cancel the running update, if any. Its results are discarded."""
+        self._update_generation += 1
+        if self._update_cancellable is not None:
+            self._update_cancellable.set()
+            self._update_cancellable = None
 
-        # Get list of files from current repository
-        self.selected_items = []
+    def _update_worker(self, task, cancellable):
+        """Scan the repository and classify documents (worker thread)"""
         try:
-            docs = util.get_files(repository.docs)
-        except KeyError:
-            docs = []
-
-        # Initialize variables
-        items = []      # Valid items
-        invalid = []    # Invalid items
-
-        keys_used = {}
-        key_fields = [('Date', 0), ('Country', 1), ('Group', 2), ('SentBy', 3), ('Purpose', 4), ('Concept', 5), ('SentTo', 6)]
-        for skey, nkey in key_fields:
-            keys_used[skey] = set() # Avoid duplicates
-
-        desc = {}
-        concepts_active = set()
-        concepts_inactive = set()
-        show_pending = False
-
-        for filename in docs:
-            doc, ext = util.filename_details(filename)
-            fields = doc.split('-')
-            if util.filename_validate(doc):
-                active = True
-                for skey, nkey in key_fields:
-                    config = self.app.get_config(skey)
-                    key = fields[nkey]
-                    if nkey == 0:
-                        # Date field cached value differs from other fields
-                        key = fields[nkey]
-                        try:
-                            desc[skey] = self.cache[skey][key]
-                        except KeyError:
-                            desc[skey] = util.filename_date_human_simple(key)
-                            if desc[skey] is None:
-                                active &= False
-                                desc[skey] = ''
-                            else:
-                                self.cache[skey][key] = desc[skey]
-                    elif nkey != 5:
-                        description = config.get(key)
-                        if description is None:
-                            description = key
-                        desc[skey] = description
-                        active &= config.exists_used(key=key)
+            scanner = self.app.get_service('scanner')
+            dirpath = task['dirpath']
+            scanner.scan(dirpath)
+            generation, changes = scanner.changes_since(dirpath, task['scan_generation'])
+            if cancellable.is_set():
+                return
+
+            docs = task['docs']
+            docindex = None
+            full = changes is None or task['full']
+            if full:
+                # Parsed fields come from the persistent index when it is fresh.
+                # Every worker maps it on its own: another one may still be
+                # reading its previous map.
+                docs = {}
+                names = scanner.get_files(dirpath)
+                docindex = MiAZDocumentIndex(self.app)
+                if docindex.load(dirpath, names, scanner.get_stamp(dirpath)):
+                    pending = docindex.rows()
+                else:
+                    pending = ((name, None) for name in names)
             else:
-                invalid.append(filename)
-                active = False
+                for name in changes.removed:
+                    docs.pop(name, None)
+                for name in changes.modified:
+                    docs.pop(name, None)
+                renamed = []
+                for old, new in changes.renamed:
+                    docs.pop(old, None)
+                    renamed.append(new)
+                pending = ((name, None) for name in changes.added + changes.modified + renamed)
+
+            # Classify documents against a frozen copy of the repository config
+            pipeline = MiAZPipeline(task['config'], task['dates'])
+            try:
+                result = pipeline.classify_rows(pending, cancellable, task['previous'])
+            finally:
+                if docindex is not None:
+                    docindex.close()
+            if result is None:
+                return
+            docs.update(result.items)
+            concepts_active, concepts_inactive, review = pipeline.summarize(docs.values())
+            if cancellable.is_set():
+                return
+
+            # Filter bitsets for the new set of documents
+            bitmap = task['bitmap'].copy()
+            bitmap.update(task['previous'], docs)
+            if cancellable.is_set():
+                return
+
+            # Tokens of the documents that changed
+            search = task['search'].copy()
+            search.update(task['previous'], docs)
+            if cancellable.is_set():
+                return
+
+            task['scan_generation'] = generation
+            task['docs'] = docs
+            task['bitmap'] = bitmap
+            task['search'] = search
+            task['invalid'] = result.invalid
+            task['concepts'] = (sorted(concepts_active), sorted(concepts_inactive))
+            task['review'] = review
+            GLib.idle_add(self._update_finish, task)
+        except Exception as error:
+            self.log.error(f"Workspace update failed: {error}")
+
+    def _update_finish(self, task):
+        """Apply the results of an update (main thread)"""
+        if task['generation'] != self._update_generation:
+            self.log.debug("Discarding results of an outdated workspace update")
+            return False
 
-            show_pending |= not active
+        self._update_cancellable = None
+        self._update_applying = True
+        try:
+            self._update_apply(task)
+        finally:
+            self._update_applying = False
 
-            try:
-                items.append(MiAZItem
-                                    (
-                                        id=os.path.basename(filename),
-                                        date=fields[0],
-                                        date_dsc=desc['Date'],
-                                        country=fields[1],
-                                        country_dsc=desc['Country'],
-                                        group=fields[2],
-                                        group_dsc=desc['Group'],
-                                        sentby_id=fields[3],
-                                        sentby_dsc=desc['SentBy'],
-                                        purpose=fields[4],
-                                        purpose_dsc=desc['Purpose'],
-                                        title=doc, #f'{doc}.{ext}',
-                                        subtitle=fields[5].replace('_', ' '),
-                                        sentto_id=fields[6],
-                                        sentto_dsc=desc['SentTo'],
-                                        extension = filename[filename.rfind('.')+1:],
-                                        active=active
-                                    )
-                            )
-                if active:
-                    concepts_active.add(fields[5].replace('_', ' '))
-                else:
-                    concepts_inactive.add(fields[5].replace('_', ' '))
-            except (IndexError, KeyError):
-                items.append(MiAZItem
-                                    (
-                                        id=os.path.basename(filename),
-                                        date='',
-                                        date_dsc='',
-                                        country='',
-                                        country_dsc='',
-                                        group='',
-                                        group_dsc='',
-                                        sentby_id='',
-                                        sentby_dsc='',
-                                        purpose='',
-                                        purpose_dsc='',
-                                        title=doc, #f'{doc}.{ext}',
-                                        subtitle='_'.join(fields),
-                                        sentto_id='',
-                                        sentto_dsc='',
-                                        extension = filename[filename.rfind('.')+1:],
-                                        active=active
-                                    )
-                            )
-
-        ENV['CACHE']['CONCEPTS']['ACTIVE'] = sorted(concepts_active)
-        ENV['CACHE']['CONCEPTS']['INACTIVE'] = sorted(concepts_inactive)
-
-        # Update workspace view — refresh filter cache before handing off to the view
-        self._refresh_filter_cache()
-        self._num_total_items = len(docs)
-        GLib.idle_add(self._idle_view_update, items)
+        # Measure performance (end timestamp and result)
+        de = datetime.now()
+        dt = de - task['start']
+        self.log.debug(f"Workspace updated in {dt}s")
+
+        if self._update_pending:
+            self._update_pending = False
+            self.update()
+        return False
+
+    def _update_apply(self, task):
+        util = self.app.get_service('util')
+        repository = self.app.get_service('repo')
+
+        self.cache['Date'].update(task['dates'])
+        self._search = task['search']
+        self._bitmap = task['bitmap']
+        self._docs = task['docs']
+        self._scan_dirpath = task['dirpath']
+        self._scan_generation = task['scan_generation']
+        self._config_version = task['config_version']
+        review = task['review']
+        show_pending = review > 0
+
+        ENV['CACHE']['CONCEPTS']['ACTIVE'], ENV['CACHE']['CONCEPTS']['INACTIVE'] = task['concepts']
+
+        self._num_total_items = len(self._docs)
+        GLib.idle_add(self._idle_view_update, self._docs)
 
         renamed = 0
-        for filename in invalid:
+        for filename in task['invalid']:
             source = os.path.join(repository.docs, filename)
             btarget = util.filename_normalize(filename)
             target = os.path.join(repository.docs, btarget)
@@ -544,11 +638,6 @@ class MiAZWorkspace(Gtk.Box):
         if renamed > 0:
             self.log.debug(f"Documents renamed: {renamed}")
 
-        review = 0
-        for item in items:
-            if not item.active:
-                review += 1
-
         togglebutton = self.app.get_widget('workspace-togglebutton-pending-docs')
         togglebutton.set_label(_("Review ({review})").format(review=review))
         style_ctx = togglebutton.get_style_context()
@@ -570,17 +659,14 @@ class MiAZWorkspace(Gtk.Box):
             togglebutton.set_active(False)
         self.review = togglebutton.get_active()
 
-        # Measure performance (end timestamp and result)
-        de = datetime.now()
-        dt = de - ds
-        self.log.debug(f"Workspace updated in {dt}s")
-
-        self.app.set_status(MiAZStatus.RUNNING)
-        return False
-
-    def _idle_view_update(self, items):
+    def _idle_view_update(self, docs):
         """Apply the store splice and emit the updated signal with correct post-filter counts."""
-        self.view.update(items)
+        # The store filters documents with the current filters: no need
+        # to filter them again afterwards
+        self._refresh_filter_cache()
+        self._filter_state = self._get_filter_state()
+        self.view.update(docs)
+        self.selected_items = self.view.get_selected_items()
         model = self.view.cv.get_model()
         self._num_selected_items = len(self.selected_items)
         self._num_displayed_items = len(model)
@@ -588,114 +674,135 @@ class MiAZWorkspace(Gtk.Box):
         return False
 
     def _refresh_filter_cache(self):
-        """Pre-compute per-filter-pass constants so per-item callbacks are cheap."""
-        util = self.app.get_service('util')
+        """Resolve the filter controls into bitsets, once per filter pass.
+
+        Per-item callbacks only check whether the document belongs to
+        the result (see _do_filter_view_main).
+        """
+        index = self._bitmap
         self._cached_dropdowns = self.app.get_widget('ws-dropdowns')
+        dropdowns = self._cached_dropdowns
         entry = self.app.get_widget('searchentry')
         self._cached_search_text = entry.get_text()
 
-        dd_date = self._cached_dropdowns[Date.__gtype_name__]
+        dd_date = dropdowns[Date.__gtype_name__]
         selected = dd_date.get_selected_item()
         if selected is None:
-            self._cached_date_ll = 'All'
-            self._cached_date_ul = 'All'
-            self._cached_date_start = None
-            self._cached_date_end = None
+            ll, ul = 'All', 'All'
         else:
             ll, ul = selected.id.split('-')
-            self._cached_date_ll = ll
-            self._cached_date_ul = ul
-            if ll not in ('All', 'None') and ul not in ('All', 'None'):
-                self._cached_date_start = util.string_to_datetime(ll)
-                self._cached_date_end = util.string_to_datetime(ul)
-            else:
-                self._cached_date_start = None
-                self._cached_date_end = None
-
-    def _do_eval_cond_matches_freetext(self, item):
-        return self._cached_search_text.upper() in item.search_text.upper()
+        self._cached_date_ll = ll
+        self._cached_date_ul = ul
 
-    def _do_eval_cond_matches(self, dropdown, id):
-        item = dropdown.get_selected_item()
-        if item is None:
-            return True
+        # Conditions not depending on field dropdowns
+        base = index.all
+        hits = self._search.search(self._cached_search_text)
+        if hits is not None:
+            base &= index.bitset(hits)
 
-        if item.id == 'Any':
-            return True
-        elif item.id == 'None':
-            if len(id) == 0:
-                return True
-        else:
-            return item.id.upper() == id.upper()
-
-    def _do_eval_cond_matches_date(self, item):
-        try:
-            item_dt = self.datetimes[item.date]
-        except KeyError:
-            util = self.app.get_service('util')
-            item_dt = util.string_to_datetime(item.date)
-            self.datetimes[item.date] = item_dt
-
-        ll, ul = self._cached_date_ll, self._cached_date_ul
-        if ll == 'All' and ul == 'All':
-            return True
-        elif ll == 'None' and ul == 'None':
-            return item_dt is None
-        elif item_dt is None:
-            return False
-        return self._cached_date_start <= item_dt <= self._cached_date_end
+        # When a specific project is selected, bypass the date and active checks:
+        # project members may have unrecognised field values (inactive) or any date.
+        bypass = False
+        project_dd = self.app.get_widget('plugin-MiAZProjectMgt-dropdown')
+        if project_dd is not None:
+            sel = project_dd.get_selected_item()
+            if sel is not None and sel.id not in ('Any', 'None'):
+                bypass = True
 
-    def _do_eval_cond_matches_active(self, item):
-        # ~ self.log.warning(f"\t\t{item.id} active? {item.active}") # DEBUG FILTERS
-        return item.active
+        if self.review:
+            # Project members are all considered active
+            base = 0 if bypass else base & ~index.active
+        elif not bypass:
+            base &= index.active
+            if ll == 'None' and ul == 'None':
+                base &= index.undated()
+            elif ll != 'All' or ul != 'All':
+                base &= index.dates(ll, ul)
+
+        for name, callback in self._bitmap_filters.items():
+            bits = callback(index)
+            if bits is not None:
+                base &= bits
+
+        # Field dropdowns
+        result = base
+        for skey, attr in FACET_FIELDS:
+            item = dropdowns[skey].get_selected_item()
+            bits = index.field(skey, None if item is None else item.id)
+            if bits is not None:
+                result &= bits
+
+        self._cached_base = base
+        self._cached_visible = index.membership(result)
+
+        # Item filters, cheapest and most selective first
+        order = self._filter_chain.get_order()
+        self._filter_chain.compile(self._workspace_filters)
+        if self._filter_chain.get_order() != order:
+            self.log.debug(f"Workspace filters order: {', '.join(self._filter_chain.get_order())}")
 
     def _do_filter_view(self, item, filter_list_model):
-        show_item = True
-        lresults = []
-        for name in self._workspace_filters:
-            filter_func = self._workspace_filters[name]
-            result = filter_func(item, filter_list_model)
-            lresults.append(f"{name}[{result}]")
-            show_item = show_item and result
-        # DEBUG FILTERS
-        # ~ msg = '\t\t' + ' and '.join(lresults) # DEBUG FILTERS
-        # ~ msg += f" = {show_item}" # DEBUG FILTERS
-        # ~ self.log.error(msg)
-        return show_item
+        return self._filter_chain(item, filter_list_model)
 
     def _do_filter_view_main(self, item, filter_list_model):
-        show_item = False
+        return self._cached_visible(item.id)
+
+    def _schedule_facets(self, *args):
+        """Recompute dropdown counts once the main loop is idle"""
+        if self._facets_source is None:
+            self._facets_source = GLib.idle_add(self._update_facets)
+
+    def _get_facets_key(self):
         dropdowns = self._cached_dropdowns
-        c0 = self._do_eval_cond_matches_freetext(item)
-        ca = self._do_eval_cond_matches_active(item)
-        cd = self._do_eval_cond_matches_date(item)
-        c1 = self._do_eval_cond_matches(dropdowns['Country'], item.country)
-        c2 = self._do_eval_cond_matches(dropdowns['Group'], item.group)
-        c4 = self._do_eval_cond_matches(dropdowns['SentBy'], item.sentby_id)
-        c5 = self._do_eval_cond_matches(dropdowns['Purpose'], item.purpose)
-        c6 = self._do_eval_cond_matches(dropdowns['SentTo'], item.sentto_id)
+        plugin_dropdowns = self.app.get_widget('plugin-dropdowns') or []
+        selected = []
+        for dropdown in list(dropdowns.values()) + plugin_dropdowns:
+            item = dropdown.get_selected_item()
+            selected.append(None if item is None else item.id)
+        return (id(self._docs), self.review, self._cached_search_text,
+                self._cached_date_ll, self._cached_date_ul, tuple(selected))
+
+    def _update_facets(self):
+        self._facets_source = None
+        if self._cached_dropdowns is None:
+            return False
 
-        # When a specific project is selected, bypass the date and active checks:
-        # project members may have unrecognised field values (ca=False) or any date.
-        project_dd = self.app.get_widget('plugin-MiAZProjectMgt-dropdown')
-        if project_dd is not None:
-            sel = project_dd.get_selected_item()
-            if sel is not None and sel.id not in ('Any', 'None'):
-                cd = True
-                ca = True
+        # Nothing to do if neither documents nor filters changed
+        key = self._get_facets_key()
+        if key == self._facets_key:
+            return False
+        self._facets_key = key
 
-        if self.review:
-            show_item = not ca and c0 and c1 and c2 and c4 and c5 and c6
+        dropdowns = self._cached_dropdowns
+        selected = {}
+        for skey, attr in FACET_FIELDS:
+            item = dropdowns[skey].get_selected_item()
+            selected[skey] = None if item is None else item.id
+
+        # Plug-ins filtering item by item need a pass over documents
+        item_filters = [func for name, func in self._workspace_filters.items() if name != 'main']
+        if item_filters:
+            in_base = self._bitmap.membership(self._cached_base)
+            def accept(item):
+                if not in_base(item.id):
+                    return False
+                for func in item_filters:
+                    if not func(item, None):
+                        return False
+                return True
+            self._facets.compute(self._docs.values(), selected, accept)
         else:
-            show_item = ca and c0 and c1 and c2 and c4 and c5 and c6 and cd
+            self._facets.compute_bitmap(self._bitmap, self._cached_base, selected)
 
-        # DEBUG FILTERS
-        # ~ self.log.warning(f"{item.id}: prj[{sel.id}]\tc0[{c0}] ca[{ca}] cd[{cd}] c1[{c1}] c2[{c2}] c4[{c4}] c5[{c5}] c6[{c6}] = {show_item}") # DEBUG FILTERS
-        return show_item
+        factory = self.app.get_service('factory')
+        for skey, attr in FACET_FIELDS:
+            counts = lambda key, skey=skey: self._facets.get(skey, key)
+            factory.dropdown_set_counts(dropdowns[skey], counts)
+        return False
 
     def _do_connect_filter_signals(self):
         searchentry = self.app.get_widget('searchentry')
-        searchentry.connect('changed', self._on_filter_selected)
+        searchentry.connect('changed', self._on_search_changed)
         dropdowns = self.app.get_widget('ws-dropdowns')
         for dropdown in dropdowns:
             dropdowns[dropdown].connect("notify::selected-item", self._on_filter_selected)
@@ -703,6 +810,13 @@ class MiAZWorkspace(Gtk.Box):
         selection.connect('selection-changed', self._on_selection_changed)
 
     def _on_filter_selected(self, *args):
+        self._apply_filters(force=True)
+
+    def _on_view_updated(self, *args):
+        # Documents are filtered already, unless filters changed since
+        self._apply_filters(force=False)
+
+    def _apply_filters(self, force: bool):
         if self._clearing_filters:
             return
 
@@ -715,24 +829,125 @@ class MiAZWorkspace(Gtk.Box):
             return
 
         if self.workspace_loaded:
+            self._cancel_search_delay()
             self._refresh_filter_cache()
-            self.view.refilter()
+            state = self._get_filter_state()
+            if force or state != self._filter_state:
+                change = self._get_filter_change(self._filter_state, state)
+                self._filter_state = state
+                self.view.refilter(change)
             model = self.view.cv.get_model()
+            self.selected_items = self.view.get_selected_items()
             self._num_selected_items = len(self.selected_items)
             self._num_displayed_items = len(model)
             self.emit('workspace-view-filtered')
 
-    def _on_selection_changed(self, selection, position, n_items):
-        repository = self.app.get_service('repo')
-        util = self.app.get_service('util')
-        self.selected_items = []
-        model = selection.get_model()
-        bitset = selection.get_selection()
-        for index in range(bitset.get_size()):
-            pos = bitset.get_nth(index)
-            item = model.get_item(pos)
-            self.selected_items.append(item)
+    def _on_search_changed(self, *args):
+        """Apply the search text once the user stops typing"""
+        if self._clearing_filters:
+            return
+        self._cancel_search_delay()
+        self._search_source = GLib.timeout_add(SEARCH_DELAY, self._on_search_delay)
+
+    def _on_search_delay(self):
+        self._search_source = None
         self._on_filter_selected()
+        return False
+
+    def _cancel_search_delay(self):
+        if self._search_source is not None:
+            GLib.source_remove(self._search_source)
+            self._search_source = None
+
+    def _get_filter_state(self):
+        """Snapshot of the filter controls (see _refresh_filter_cache)"""
+        selected = {}
+        for name, dropdown in self._cached_dropdowns.items():
+            if name == Date.__gtype_name__:
+                continue
+            item = dropdown.get_selected_item()
+            selected[name] = 'Any' if item is None else item.id
+        plugins = []
+        for dropdown in self.app.get_widget('plugin-dropdowns') or []:
+            item = dropdown.get_selected_item()
+            plugins.append(None if item is None else item.id)
+        return {
+            'docs': id(self._docs),
+            'review': self.review,
+            'search': self._cached_search_text,
+            'date': (self._cached_date_ll, self._cached_date_ul),
+            'dropdowns': selected,
+            'plugins': plugins,
+            'filters': tuple(self._workspace_filters) + tuple(self._bitmap_filters),
+        }
+
+    def _get_filter_change(self, old, new):
+        """Tell how the result of new filters relates to the old one.
+
+        MORE_STRICT when it can only be a subset, LESS_STRICT when it
+        can only be a superset, DIFFERENT otherwise. Identical states
+        are DIFFERENT as well: something not in the state (eg.: plug-in
+        data) must have changed.
+        """
+        DIFFERENT = Gtk.FilterChange.DIFFERENT
+        if old is None or old == new:
+            return DIFFERENT
+        for key in ['docs', 'review', 'plugins', 'filters']:
+            if old[key] != new[key]:
+                return DIFFERENT
+
+        stricter = looser = False
+
+        # Search text
+        if old['search'] != new['search']:
+            if narrows(old['search'], new['search']):
+                stricter = True
+            elif narrows(new['search'], old['search']):
+                looser = True
+            else:
+                return DIFFERENT
+
+        # Field dropdowns
+        for name, sel_new in new['dropdowns'].items():
+            sel_old = old['dropdowns'].get(name)
+            if sel_old == sel_new:
+                continue
+            if sel_old == 'Any':
+                stricter = True
+            elif sel_new == 'Any':
+                looser = True
+            else:
+                return DIFFERENT
+
+        # Date range
+        if old['date'] != new['date']:
+            (oll, oul), (nll, nul) = old['date'], new['date']
+            special = ('All', 'None')
+            if oll == 'All' and oul == 'All':
+                stricter = True
+            elif nll == 'All' and nul == 'All':
+                looser = True
+            elif oll in special or nll in special or oul in special or nul in special:
+                return DIFFERENT
+            elif oll <= nll and nul <= oul:
+                stricter = True
+            elif nll <= oll and oul <= nul:
+                looser = True
+            else:
+                return DIFFERENT
+
+        if stricter and looser:
+            return DIFFERENT
+        if stricter:
+            return Gtk.FilterChange.MORE_STRICT
+        return Gtk.FilterChange.LESS_STRICT
+
+    def _on_selection_changed(self, selection, position, n_items):
+        # Selecting documents doesn't change what is displayed, so
+        # there is nothing to filter again. Only counters change.
+        self.selected_items = self.view.get_selected_items()
+        self._num_selected_items = len(self.selected_items)
+        self.emit('workspace-view-selection-changed')
 
     def get_num_selected_items(self):
         return self._num_selected_items
@@ -752,9 +967,22 @@ class MiAZWorkspace(Gtk.Box):
         selection.unselect_all()
 
     def _on_application_finished(self, *args):
+        self.cancel_update()
         util = self.app.get_service('util')
         util.json_save(self.fcache, self.cache)
         self.log.debug(f"Workspace cache saved to {self.fcache}")
 
+        # Leave the document index up to date for the next start
+        repository = self.app.get_service('repo')
+        if repository.docs is not None:
+            scanner = self.app.get_service('scanner')
+            docindex = self.app.get_service('docindex')
+            names = scanner.get_files(repository.docs)
+            docindex.load(repository.docs, names, scanner.get_stamp(repository.docs))
+
     def get_workspace_filters(self):
         return self._workspace_filters
+
+    def get_workspace_filters_stats(self):
+        """Sampled calls, passes and time (seconds) of every item filter"""
+        return self._filter_chain.get_stats()
@@ -77,7 +77,7 @@ class MiAZDeleteItemPlugin(MiAZExtension):
             self.plugin.set_started(started=True)
 
     def document_delete(self, *args):
-        items = self.workspace.get_selected_items()
+        items = list(self.workspace.get_selected_items())
         if self.actions.stop_if_no_items():
             self.log.debug("No items selected")
             return
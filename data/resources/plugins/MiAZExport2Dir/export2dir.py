@@ -100,7 +100,7 @@ class Export2Dir(MiAZExtension):
             self.plugin.set_started(started=True)
 
     def export(self, *args):
-        self.items = self.workspace.get_selected_items()
+        self.items = list(self.workspace.get_selected_items())
         if self.actions.stop_if_no_items():
             self.log.debug("No items selected")
             return
@@ -199,7 +199,7 @@ class MiAZMassRenamingPlugin(MiAZExtension):
                     self.util.filename_rename(source, target)
                 self.app.set_status(MiAZStatus.RUNNING)
 
-        items = self.workspace.get_selected_items()
+        items = list(self.workspace.get_selected_items())
         if self.actions.stop_if_no_items():
             self.log.debug("No items selected")
             return
@@ -87,6 +87,92 @@ class MiAZConfigPeriodicity(MiAZConfig):
         )
 
 
+# Data
+class MiAZPeriodicityData:
+    """
+    In-memory copy of the plugin data file.
+
+    {'documents': {doc: pid}, 'periodicity': {pid: [doc, ...]}}
+
+    The file is only read again when its modification time changes.
+    Writes refresh the cached modification time, so they don't cause
+    a reload. Document lists are kept as sets.
+    """
+
+    def __init__(self, util, datafile, log):
+        self.util = util
+        self.datafile = datafile
+        self.log = log
+        self._mtime = None
+        self._documents = {}    # Document -> pid
+        self._index = {}        # pid -> set of documents
+
+    def _stat(self):
+        try:
+            return os.stat(self.datafile).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def load(self):
+        """Read the data file if it changed since the last read/write"""
+        mtime = self._stat()
+        if mtime is not None and mtime == self._mtime:
+            return
+        if mtime is None:
+            self.log.debug(f"Creating new data file in {self.datafile}")
+            self._documents = {}
+            self._index = {}
+            self.save()
+            return
+        data = self.util.json_load(filepath=self.datafile)
+        self._documents = dict(data.get('documents', {}))
+        self._index = {pid: set(docs) for pid, docs in data.get(f'{i_confname}', {}).items()}
+        self._mtime = mtime
+
+    def save(self):
+        data = {}
+        data['documents'] = self._documents
+        data[f'{i_confname}'] = {pid: sorted(docs) for pid, docs in self._index.items()}
+        self.util.json_save(self.datafile, data)
+        self._mtime = self._stat()
+
+    def get_pid(self, doc_id):
+        self.load()
+        return self._documents.get(doc_id)
+
+    def get_documents(self, pid) -> set:
+        self.load()
+        return self._index.get(pid, set())
+
+    def set(self, documents, pid) -> bool:
+        """Set a periodicity to documents (not saved)"""
+        self.load()
+        change = False
+        for doc_id in documents:
+            old = self._documents.get(doc_id)
+            if old is not None and old != pid:
+                self._index.get(old, set()).discard(doc_id)
+            self._documents[doc_id] = pid
+            self._index.setdefault(pid, set()).add(doc_id)
+            change = True
+        return change
+
+    def unset(self, documents) -> bool:
+        """Unset any periodicity of documents (not saved)"""
+        self.load()
+        change = False
+        for doc_id in documents:
+            if self._documents.pop(doc_id, None) is not None:
+                change = True
+            # Documents may be listed under a periodicity without
+            # being in the documents dictionary
+            for docs in self._index.values():
+                if doc_id in docs:
+                    docs.discard(doc_id)
+                    change = True
+        return change
+
+
 # Columnview
 class MiAZColumnViewPeriodicity(MiAZColumnViewSelector):
     """ Custom ColumnView widget for MiAZ """
@@ -135,6 +221,7 @@ class MiAZPeriodicityView(MiAZConfigView):
 class MiAZPeriodicityPlugin(MiAZExtension):
     __gtype_name__ = 'MiAZPeriodicityPlugin'
     plugin = None
+    data = None
 
     def do_activate(self):
         """Plugin activation"""
@@ -212,35 +299,26 @@ class MiAZPeriodicityPlugin(MiAZExtension):
             else:
                 section.append(Adw.SidebarItem(title=i_title, suffix=dropdown))
 
-            self.workspace.register_filter_view(f'{i_title}', self._do_filter_view)
+            self.workspace.register_filter_view(f'{i_title}', self._do_filter_view, bitmap=True)
 
             # Plugin configured
             self.plugin.set_started(started=True)
 
-    def _do_filter_view(self, item, filter_list_model):
-        display = False         # set display to false
-        doc_id = item.id         # Document to display (or not)
+    def _do_filter_view(self, index):
+        """Bitset of documents with the selected periodicity (None: all)"""
         plugin_name = self.plugin.get_name()
         dropdown = self.app.get_widget(f'plugin-{plugin_name}-dropdown')
         selected_item = dropdown.get_selected_item()    # Property key selected to filter
         if selected_item is None:
-            return True
+            return None
 
         pid = selected_item.id
-        data = self._get_data()
-
         if pid == 'Any':
-            display = True
+            return None
         elif pid == 'None':
-            display = False
-        else:
-            try:
-                docs = data[f'{i_confname}'][pid]
-                if doc_id in docs:
-                    display = True
-            except KeyError:
-                display = False
-        return display
+            return 0
+
+        return index.bitset(self._get_data().get_documents(pid))
 
     def _set_property(self, *args):
         parent = self.workspace.get_root()
@@ -255,16 +333,11 @@ class MiAZPeriodicityPlugin(MiAZExtension):
             self.srvdlg.show_error(title=_('Action ignored'), body=_('You must select at least one document'), parent=parent)
 
     def _get_data(self):
+        """Data of the current repository"""
         datafile = self.plugin.get_data_file()
-        try:
-            data = self.util.json_load(filepath=datafile)
-        except FileNotFoundError:
-            self.log.debug(f"Creating new data file in {datafile}")
-            data = {}
-            data['documents'] = {}
-            data[f'{i_confname}'] = {}
-            self.util.json_save(filepath=datafile, adict=data)
-        return data
+        if self.data is None or self.data.datafile != datafile:
+            self.data = MiAZPeriodicityData(self.util, datafile, self.log)
+        return self.data
 
     def _on_set_property_response(self, dialog, response, dropdown):
         parent = self.workspace.get_root()
@@ -287,29 +360,11 @@ class MiAZPeriodicityPlugin(MiAZExtension):
                 self.srvdlg.show_toast(body)
 
     def _set_property_real(self, selected_documents, pid):
-        change = False
         data = self._get_data()
-        documents = data['documents']
-        config_data = data[f'{i_confname}']
-
-        for doc_id in selected_documents:
-            self.log.debug(f"Request to set {i_confname} '{pid}' for document '{doc_id}'")
-            documents[doc_id] = pid
-            if pid in config_data:
-                s = set(config_data[pid])
-                s.add(doc_id)
-                config_data[pid] = list(s)
-            else:
-                config_data[pid] = [doc_id]
-            change = True
-            self.log.debug(f"{i_title} for document '{doc_id}' set to '{pid}'")
-
-        # Save data
+        change = data.set(selected_documents, pid)
         if change:
-            data['documents'] = documents
-            data[f'{i_confname}'] = config_data
-            datafile = self.plugin.get_data_file()
-            self.util.json_save(datafile, data)
+            data.save()
+            self.log.debug(f"{i_title} for {len(selected_documents)} documents set to '{pid}'")
         return change
 
     def _unset_property(self, *args):
@@ -321,38 +376,10 @@ class MiAZPeriodicityPlugin(MiAZExtension):
         self.srvdlg.show_toast(_('Removed {i_confname} for selected documents').format(i_confname=i_confname))
 
     def _unset_property_real(self, selected_documents):
-        change = False
         data = self._get_data()
-        documents = data['documents']
-        config_data = data[f'{i_confname}']
-
-        for doc_id in selected_documents:
-            self.log.debug(f"Request to unset any {i_confname} for document '{doc_id}'")
-            if doc_id in data.get("documents", {}):
-                # Get the config key before deleting the document
-                pid = data["documents"][doc_id]
-                del data["documents"][doc_id]
-
-                # Remove from config_data if the config key exists
-                if pid in data.get(f'{i_confname}', {}):
-                    # Remove all occurrences of the doc_id from the config_data list
-                    doc_list = data[f'{i_confname}'][pid]
-                    while doc_id in doc_list:
-                        doc_list.remove(doc_id)
-                change = True
-                self.log.debug(f"{i_title} '{pid}' unset for document '{doc_id}'")
-
-            # Additionally, check all other keys in case the document exists there
-            # even if it wasn't in the documents dictionary
-            for pid, doc_list in data.get(f'{i_confname}', {}).items():
-                while doc_id in doc_list:
-                    doc_list.remove(doc_id)
-                    change = True
-
-        # Save data
+        change = data.unset(selected_documents)
         if change:
-            datafile = self.plugin.get_data_file()
-            self.util.json_save(datafile, data)
+            data.save()
             self.log.debug(f"{i_title} for {len(selected_documents)} documents removed")
             self.workspace.update()
         else:
@@ -383,12 +410,7 @@ class MiAZPeriodicityPlugin(MiAZExtension):
 
     def _get_pid(self, doc_id):
         """Return the property key associated to a document"""
-        data = self._get_data()
-        documents = data['documents']
-        try:
-            return documents[doc_id]
-        except KeyError:
-            return None
+        return self._get_data().get_pid(doc_id)
 
     def _on_filename_renamed(self, util, fp_source, fp_target):
         source = os.path.basename(fp_source)
@@ -58,7 +58,10 @@ i_confname = item_type.__config_name__
 class MiAZProject(GObject.GObject):
     """Service that manages document-to-project assignments.
     Merged from MiAZ.backend.projects into the plugin so the plugin
-    owns its full data lifecycle."""
+    owns its full data lifecycle.
+
+    Projects are kept as sets of documents, with a reverse index from
+    documents to projects. projects.json still stores lists."""
     __gtype_name__ = 'MiAZProject'
 
     def __init__(self, app):
@@ -69,15 +72,23 @@ class MiAZProject(GObject.GObject):
         util = self.app.get_service('util')
         repo_dir_conf = repository.get('dir_conf')
         self.cnfprj = os.path.join(repo_dir_conf, 'projects.json')
-        self.projects = {}
+        self.projects = {}      # Project -> set of documents
+        self.assigned = {}      # Document -> set of projects
         if not os.path.exists(self.cnfprj):
             self.save()
             self.log.debug("Created new config file for projects")
         self.projects = self.load()
+        self._reindex()
         self.check()
         util.connect('filename-renamed', self._on_filename_renamed)
         util.connect('filename-deleted', self._on_filename_deleted)
 
+    def _reindex(self):
+        self.assigned = {}
+        for project, docs in self.projects.items():
+            for doc in docs:
+                self.assigned.setdefault(doc, set()).add(project)
+
     def check(self):
         repository = self.app.get_service('repo')
         to_delete = []
@@ -87,42 +98,50 @@ class MiAZProject(GObject.GObject):
                 if not os.path.exists(docpath):
                     to_delete.append((doc, project))
         for doc, project in to_delete:
-            self.remove(project, doc)
+            self._remove_nosave(project, doc)
             self.log.warning(f"Document '{doc}' not found; removed from project '{project}'")
+        if to_delete:
+            self.save()
         self.log.debug("Projects consistency checked")
 
-    def add(self, project: str, doc: str):
+    def _add_nosave(self, project: str, doc: str) -> None:
         try:
-            docs = self.projects[project]
-            if doc not in docs:
-                docs.append(doc)
-                self.projects[project] = docs
+            self.projects[project].add(doc)
         except KeyError:
-            self.projects[project] = [doc]
+            self.projects[project] = {doc}
+        try:
+            self.assigned[doc].add(project)
+        except KeyError:
+            self.assigned[doc] = {project}
+
+    def add(self, project: str, doc: str):
+        self._add_nosave(project, doc)
         self.log.debug(f"Added '{doc}' to project '{project}'")
 
     def add_batch(self, project: str, docs: list) -> None:
         for doc in docs:
-            self.add(project, doc)
+            self._add_nosave(project, doc)
+        self.log.debug(f"Added {len(docs)} documents to project '{project}'")
         self.save()
 
     def _remove_nosave(self, project: str, doc: str) -> bool:
         found = False
         if len(project) == 0:
-            for prj in self.projects:
-                docs = self.projects[prj]
-                if doc in docs:
-                    found = True
-                    docs.remove(doc)
-                    self.projects[prj] = docs
-                    self.log.debug(f"Removed '{doc}' from project '{prj}'")
+            projects = self.assigned.pop(doc, set())
+            for prj in projects:
+                self.projects[prj].discard(doc)
+                found = True
+                self.log.debug(f"Removed '{doc}' from project '{prj}'")
         else:
             try:
                 docs = self.projects[project]
                 if doc in docs:
                     found = True
-                    docs.remove(doc)
-                    self.projects[project] = docs
+                    docs.discard(doc)
+                    projects = self.assigned[doc]
+                    projects.discard(project)
+                    if not projects:
+                        del self.assigned[doc]
                     self.log.debug(f"Removed '{doc}' from project '{project}'")
             except KeyError:
                 self.log.warning(f"Project '{project}' doesn't exist")
@@ -141,45 +160,49 @@ class MiAZProject(GObject.GObject):
         self.save()
 
     def exists(self, project, doc):
-        try:
-            return doc in self.projects[project]
-        except KeyError:
-            return False
+        return project in self.assigned.get(doc, ())
 
     def assigned_to(self, doc) -> list:
-        return [prj for prj, docs in self.projects.items() if doc in docs]
+        return sorted(self.assigned.get(doc, ()))
 
-    def docs_in_project(self, project):
+    def docs_in_project(self, project) -> set:
+        """Documents in a project. The set must not be modified."""
         try:
             return self.projects[project]
         except KeyError:
-            return []
+            return set()
 
     def list_all(self):
         for project, docs in self.projects.items():
             self.log.debug(f"Project: {project}")
-            for doc in docs:
+            for doc in sorted(docs):
                 self.log.debug(f"\tDoc: {doc}")
 
     def save(self) -> None:
         util = self.app.get_service('util')
-        util.json_save(self.cnfprj, self.projects)
+        projects = {project: sorted(docs) for project, docs in self.projects.items()}
+        util.json_save(self.cnfprj, projects)
 
     def load(self) -> dict:
         util = self.app.get_service('util')
-        return util.json_load(self.cnfprj)
+        projects = util.json_load(self.cnfprj)
+        return {project: set(docs) for project, docs in projects.items()}
 
     def _on_filename_renamed(self, util, source, target):
         source = os.path.basename(source)
         target = os.path.basename(target)
-        for project in self.assigned_to(source):
-            self.remove(project, source)
-            self.add(project, target)
+        projects = self.assigned_to(source)
+        for project in projects:
+            self._remove_nosave(project, source)
+            self._add_nosave(project, target)
             self.log.debug(f"P[{project}]: {source} -> {target}")
+        if projects:
+            self.save()
 
     def _on_filename_deleted(self, util, target):
-        for filepath in target:
-            self.remove(project='', doc=os.path.basename(filepath))
+        docs = [os.path.basename(filepath) for filepath in target]
+        if any(doc in self.assigned for doc in docs):
+            self.remove_batch('', docs)
 
 
 # Configuration
@@ -371,7 +394,7 @@ class MiAZProjectMgt(MiAZExtension):
                         section.append(Adw.SidebarItem(title='', suffix=suffix_box))
                     else:
                         section.append(Adw.SidebarItem(title=i_title, suffix=dropdown))
-                    self.workspace.register_filter_view(f'{i_title}', self._do_filter_view)
+                    self.workspace.register_filter_view(f'{i_title}', self._do_filter_view, bitmap=True)
             else:
                 # Sidebar already set up — re-sync self.srvprj with the registered
                 # service so _set_property_real and _on_item_used_remove both operate
@@ -380,20 +403,20 @@ class MiAZProjectMgt(MiAZExtension):
 
             self.plugin.set_started(started=True)
 
-    def _do_filter_view(self, item, filter_list_model):
-        doc_id = item.id
+    def _do_filter_view(self, index):
+        """Bitset of documents in the selected project (None: all)"""
         plugin_name = self.plugin.get_name()
         dropdown = self.app.get_widget(f'plugin-{plugin_name}-dropdown')
         selected_item = dropdown.get_selected_item()
         if selected_item is None:
-            return True
+            return None
 
         pid = selected_item.id
         if pid == 'Any':
-            return True
+            return None
         if pid == 'None':
-            return False
-        return doc_id in self.srvprj.docs_in_project(pid)
+            return 0
+        return index.bitset(self.srvprj.docs_in_project(pid))
 
     def _set_property(self, *args):
         selected_items = self.workspace.get_selected_items()
@@ -454,7 +477,7 @@ class MiAZProjectMgt(MiAZExtension):
             srvprj = self.app.get_service('Projects')
             pid = dropdown.get_selected_item().id
             docs = srvprj.docs_in_project(pid)
-            items = [File(id=doc, title=doc) for doc in docs]
+            items = [File(id=doc, title=doc) for doc in sorted(docs)]
             cv.update(items)
             self.log.debug(f"{len(docs)} documents in project {pid}")
 
@@ -0,0 +1,92 @@
+#!/usr/bin/python3
+# File: test_field_index.py
+# Author: Tomás Vírseda
+# License: GPL v3
+# Description: Field index kept up to date from the scanner journal
+#
+# Usage: python3 scripts/checks/test_field_index.py
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from MiAZ.backend.models import Country, Group
+from MiAZ.backend.scanner import MiAZChangeSet
+from MiAZ.backend.util import MiAZUtil
+
+REPO = '/repo'
+INVOICE = '20240101-ES-INVOICE-ACME-PAYMENT-Electricity-ME.pdf'
+CONTRACT = '20240101-DE-CONTRACT-ACME-PAYMENT-Electricity-ME.pdf'
+PAYROLL = '20240201-ES-PAYROLL-ACME-INFO-January-ME.pdf'
+
+
+class FakeScanner:
+    """Scanner with a journal given by the test"""
+
+    def __init__(self, files):
+        self.files = list(files)
+        self.generation = 1
+        self.changes = None
+
+    def scan(self, dirpath):
+        return MiAZChangeSet()
+
+    def get_files(self, dirpath):
+        return sorted(self.files)
+
+    def get_generation(self, dirpath):
+        return self.generation
+
+    def changes_since(self, dirpath, generation):
+        if generation == self.generation:
+            return self.generation, MiAZChangeSet()
+        return self.generation, self.changes
+
+    def record(self, changes):
+        for name in changes.removed:
+            self.files.remove(name)
+        for old, new in changes.renamed:
+            self.files.remove(old)
+            self.files.append(new)
+        self.files.extend(changes.added)
+        self.generation += 1
+        self.changes = changes
+
+
+class FakeApp:
+    def __init__(self, scanner):
+        self.scanner = scanner
+
+    def get_service(self, name):
+        return {'scanner': self.scanner}[name]
+
+
+class TestFieldIndex(unittest.TestCase):
+    def setUp(self):
+        self.scanner = FakeScanner([INVOICE, PAYROLL])
+        self.util = MiAZUtil(FakeApp(self.scanner))
+
+    def test_rename_across_field_values(self):
+        self.assertEqual(self.util.field_count(REPO, Country, 'ES'), 2)
+        self.assertEqual(self.util.field_count(REPO, Group, 'INVOICE'), 1)
+
+        # Renamed outside the app: only the scanner knows about it
+        self.scanner.record(MiAZChangeSet(renamed=[(INVOICE, CONTRACT)]))
+
+        self.assertEqual(self.util.field_count(REPO, Country, 'ES'), 1)
+        self.assertEqual(self.util.field_count(REPO, Country, 'DE'), 1)
+        self.assertEqual(self.util.field_count(REPO, Group, 'INVOICE'), 0)
+        self.assertEqual(self.util.field_count(REPO, Group, 'CONTRACT'), 1)
+        self.assertEqual(self.util.field_used(REPO, Country, 'DE'), (True, [os.path.join(REPO, CONTRACT)]))
+
+    def test_rename_keeping_field_values(self):
+        renamed = INVOICE.replace('Electricity', 'Water')
+        self.scanner.record(MiAZChangeSet(renamed=[(INVOICE, renamed)]))
+        self.assertEqual(self.util.field_count(REPO, Country, 'ES'), 2)
+        self.assertEqual(self.util.field_used(REPO, Group, 'INVOICE'), (True, [os.path.join(REPO, renamed)]))
+
+
+if __name__ == '__main__':
+    unittest.main()
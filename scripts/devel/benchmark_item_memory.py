@@ -0,0 +1,125 @@
+#!/usr/bin/python3
+# File: benchmark_item_memory.py
+# Author: Tomás Vírseda
+# License: GPL v3
+# Description: Python memory used per workspace document
+#
+# Usage: python3 scripts/devel/benchmark_item_memory.py [documents]
+#
+# Compares the former MiAZItem layout (one attribute per value, eager
+# search text and sort keys) with the current one (a shared MiAZRow of
+# interned values). Only Python allocations are traced, the GObject
+# instance itself costs the same in both cases.
+
+import os
+import sys
+import random
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from gi.repository import GObject
+
+from MiAZ.backend.columns import MiAZRow
+from MiAZ.backend.models import MiAZItem
+
+COUNTRIES = {'ES': 'Spain', 'DE': 'Germany', 'FR': 'France', 'PT': 'Portugal', 'IT': 'Italy'}
+GROUPS = {'INVOICE': 'Invoices', 'CONTRACT': 'Contracts', 'PAYROLL': 'Payrolls', 'RECEIPT': 'Receipts'}
+PEOPLE = {'ACME': 'ACME Corp.', 'BANK': 'My Bank', 'GOV': 'Government', 'ME': 'Myself'}
+PURPOSES = {'PAYMENT': 'Payment', 'TAXES': 'Taxes', 'INFO': 'Information'}
+EXTENSIONS = ['pdf', 'jpg', 'odt', 'txt']
+
+
+class MiAZItemFormer(GObject.Object):
+    """MiAZItem attributes as they used to be stored"""
+    __gtype_name__ = 'MiAZItemFormer'
+
+    def __init__(self, id, date, date_dsc, group, group_dsc, country, country_dsc,
+                 purpose, purpose_dsc, sentby_id, sentby_dsc, title, subtitle,
+                 sentto_id, sentto_dsc, active, valid, icon, extension):
+        super().__init__()
+        self._id = id
+        self._title = title
+        self._date = date
+        self._date_dsc = date_dsc
+        self._country = country
+        self._country_dsc = country_dsc
+        self._group = group
+        self._group_dsc = group_dsc
+        self._purpose = purpose
+        self._purpose_dsc = purpose_dsc
+        self._sentby_id = sentby_id
+        self._sentby_dsc = sentby_dsc
+        self._subtitle = subtitle
+        self._sentto_id = sentto_id
+        self._sentto_dsc = sentto_dsc
+        self._active = active
+        self._valid = valid
+        self._icon = icon
+        self._extension = extension
+        self.search_text = ' '.join([id, date, date_dsc, group, group_dsc, country, country_dsc,
+                                     purpose, purpose_dsc, sentby_id, sentby_dsc, title, subtitle,
+                                     sentto_id, sentto_dsc, extension])
+        self._sort_date = int(date) if date.isdigit() else 0
+        self._sort_country = country.upper()
+        self._sort_group = group.upper()
+        self._sort_purpose = purpose.upper()
+        self._sort_extension = extension.upper()
+        self._sort_title = title.upper()
+        self._sort_concept = subtitle.casefold()
+        self._sort_sentby = sentby_dsc.casefold()
+        self._sort_sentto = sentto_dsc.casefold()
+
+
+def filenames(count: int) -> list:
+    rnd = random.Random(0)
+    names = []
+    for n in range(count):
+        date = f"{rnd.randint(2000, 2025)}{rnd.randint(1, 12):02d}{rnd.randint(1, 28):02d}"
+        fields = [date, rnd.choice(list(COUNTRIES)), rnd.choice(list(GROUPS)),
+                  rnd.choice(list(PEOPLE)), rnd.choice(list(PURPOSES)),
+                  f"Document_{n}", rnd.choice(list(PEOPLE))]
+        names.append('-'.join(fields) + '.' + rnd.choice(EXTENSIONS))
+    return names
+
+
+def split(filename: str) -> dict:
+    """Document values, split from the filename as the pipeline does"""
+    doc, extension = filename.rsplit('.', 1)
+    date, country, group, sentby, purpose, concept, sentto = doc.split('-')
+    return dict(id=filename, date=date, date_dsc=f"{date[6:]}/{date[4:6]}/{date[:4]}",
+                country=country, country_dsc=COUNTRIES[country],
+                group=group, group_dsc=GROUPS[group],
+                sentby_id=sentby, sentby_dsc=PEOPLE[sentby],
+                purpose=purpose, purpose_dsc=PURPOSES[purpose],
+                title=doc, subtitle=concept.replace('_', ' '),
+                sentto_id=sentto, sentto_dsc=PEOPLE[sentto],
+                extension=extension, active=True, valid=True)
+
+
+def measure(build, names: list) -> float:
+    """Bytes allocated per document by build(filename)"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [build(name) for name in names]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return (after - before) / len(names)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    names = filenames(count)
+    results = [
+        ('Former MiAZItem', lambda name: MiAZItemFormer(icon='', **split(name))),
+        ('MiAZItem', lambda name: MiAZItem(**split(name))),
+        ('MiAZRow', lambda name: MiAZRow.new(**split(name))),
+    ]
+    print(f"{count} documents")
+    for title, build in results:
+        print(f"{title:<16} {measure(build, names):>8.0f} bytes per document")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/python3
+# File: benchmark_workspace_sort.py
+# Author: Tomás Vírseda
+# License: GPL v3
+# Description: Time spent filtering and sorting workspace documents
+#
+# Usage: python3 scripts/devel/benchmark_workspace_sort.py [documents ...]
+#
+# Times the work done by MiAZColumnStore on the main thread: the first
+# filter and sort of a repository, a click on a column header (and the
+# Python compare callback it replaced), a watcher tick renaming one
+# document, a stricter filter and a different one. Only the GTK-free
+# part is measured (MiAZColumns and diff_rows). Collation keys come
+# from GLib when available, from the C library otherwise.
+
+import os
+import sys
+import time
+import random
+import locale
+from functools import cmp_to_key
+from itertools import compress
+from itertools import count as count_from
+from operator import is_, is_not, not_
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from MiAZ.backend.columns import MiAZColumns, MiAZRow, DIFF_MAX_RUNS, diff_rows, row_id
+
+try:
+    from gi.repository import GLib
+    def collate_key(value: str) -> str:
+        return GLib.utf8_collate_key(value, -1)
+except ImportError:
+    locale.setlocale(locale.LC_COLLATE, '')
+    collate_key = locale.strxfrm
+
+COUNTRIES = ['ES', 'DE', 'FR', 'PT', 'IT']
+GROUPS = ['INVOICE', 'CONTRACT', 'PAYROLL', 'RECEIPT']
+PEOPLE = {'ACME': 'ACME Corp.', 'BANK': 'My Bank', 'GOV': 'Government', 'ME': 'Myself', 'ELEC': 'Électricité'}
+PURPOSES = ['PAYMENT', 'TAXES', 'INFO']
+CONCEPTS = ['Electricity', 'Water', 'Rent', 'Salary', 'Phone', 'Insurance', 'Car', 'Health']
+
+# Default sort of the workspace: date (descending), then sender
+DEFAULT_SORT = [('sort_date', True, False), ('sort_sentby', False, True)]
+CONCEPT_SORT = [('sort_concept', False, True)]
+
+
+def new_row(rnd, n: int) -> MiAZRow:
+    date = f"{rnd.randint(2000, 2025)}{rnd.randint(1, 12):02d}{rnd.randint(1, 28):02d}"
+    sentby = rnd.choice(list(PEOPLE))
+    sentto = rnd.choice(list(PEOPLE))
+    concept = f"{rnd.choice(CONCEPTS)} {n % 97}"
+    country = rnd.choice(COUNTRIES)
+    group = rnd.choice(GROUPS)
+    purpose = rnd.choice(PURPOSES)
+    title = '-'.join([date, country, group, sentby, purpose, concept.replace(' ', '_'), sentto])
+    return MiAZRow.new(id=f"{title}.pdf", date=date, country=country, group=group,
+                       sentby_id=sentby, sentby_dsc=PEOPLE[sentby], purpose=purpose,
+                       title=title, subtitle=concept, sentto_id=sentto,
+                       sentto_dsc=PEOPLE[sentto], extension='pdf', active=True, valid=True)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def run(count: int):
+    rnd = random.Random(count)
+    rows = [new_row(rnd, n) for n in range(count)]
+    accept = lambda row: row.group != 'RECEIPT'
+
+    # Repository opened: filter every row, sort the visible ones
+    data = MiAZColumns(collate_key)
+    data.set_rows(rows)
+    def first():
+        visible = [pos for pos, row in enumerate(data.rows) if accept(row)]
+        return data.sorted_rows(visible, DEFAULT_SORT)
+    shown, t_first = timed(first)
+
+    # Column header clicked: sort the displayed rows by another key
+    def header():
+        return data.sorted_rows(data.positions(shown), CONCEPT_SORT)
+    _, t_header = timed(header)
+
+    # The same click before: Gtk.CustomSorter called a Python compare
+    # function for every comparison (GObject marshalling not included)
+    def compare(row1, row2):
+        v1 = row1.subtitle.upper()
+        v2 = row2.subtitle.upper()
+        return (v1 > v2) - (v1 < v2)
+    _, t_callback = timed(lambda: sorted(shown, key=cmp_to_key(compare)))
+
+    # Watcher tick: one document renamed. Rows are found by name and
+    # compared by identity, then the new one is inserted in sort order.
+    docs = {row.id: row for row in rows}
+    current = dict(docs)
+    del current[rows[count // 2].id]
+    row = new_row(rnd, count)
+    current[row.id] = row
+    def rename():
+        values = list(current.values())
+        fresh = list(compress(values, map(is_not, map(docs.get, current), values)))
+        data.set_rows(values)
+        kept = list(map(is_, map(current.get, map(row_id, shown)), shown))
+        stale = list(compress(count_from(), map(not_, kept)))
+        for pos in reversed(stale):
+            del shown[pos]
+        return data.insert(shown, [row for row in fresh if accept(row)], DEFAULT_SORT)
+    shown, t_rename = timed(rename)
+
+    # Stricter filter: only displayed rows are checked
+    stricter = lambda row: row.country != 'ES'
+    strict, t_strict = timed(lambda: [row for row in shown if stricter(row)])
+
+    # Another filter: every row is checked, only changed runs are notified
+    other = lambda row: row.country != 'DE'
+    def refilter():
+        visible = [pos for pos, row in enumerate(data.rows) if other(row)]
+        return diff_rows(strict, data.sorted_rows(visible, DEFAULT_SORT), DIFF_MAX_RUNS)
+    _, t_other = timed(refilter)
+
+    print(f"{count:>8} {t_first:>10.1f} {t_header:>10.1f} {t_callback:>10.1f} {t_rename:>10.1f} "
+          f"{t_strict:>10.1f} {t_other:>10.1f}")
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [10000, 50000, 200000]
+    print("Milliseconds per operation")
+    print(f"{'docs':>8} {'open':>10} {'header':>10} {'callback':>10} {'rename':>10} {'stricter':>10} {'other':>10}")
+    for count in counts:
+        run(count)
+
+
+if __name__ == '__main__':
+    main()